@@ -10,7 +10,6 @@ This module implements multiple anomaly detection algorithms including:
 """
 
 import logging
-import pickle
 import warnings
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -28,6 +27,11 @@ from tensorflow.keras import layers, models, callbacks
 from tensorflow.keras.losses import mse
 from tensorflow.keras.optimizers import Adam
 
+try:
+    import faiss
+except ImportError:  # k-NN backend is optional; IsolationForest is always available
+    faiss = None
+
 warnings.filterwarnings('ignore', category=FutureWarning)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,57 +44,109 @@ class FeatureExtractor:
         self.scalers = {}
         self.feature_names = []
         
+    # (key, default) pairs for the numeric metadata features, in column order.
+    # The timestamp-derived columns are inserted at _TIME_FEATURE_OFFSET.
+    _FEATURE_SPEC = (
+        # File-level features
+        ('file_count', 0),
+        ('total_size_bytes', 0),
+        ('compressed_size_bytes', 0),
+        ('compression_ratio', 0),
+        ('deduplication_ratio', 0),
+        ('backup_duration_seconds', 0),
+        ('throughput_mbps', 0),
+        # System resource features
+        ('cpu_usage_percent', 0),
+        ('memory_usage_percent', 0),
+        ('disk_io_rate', 0),
+        ('network_utilization', 0),
+        # Error and retry features
+        ('error_count', 0),
+        ('retry_count', 0),
+        ('checksum_failures', 0),
+        # Data integrity features
+        ('file_type_diversity', 0),
+        ('average_file_size', 0),
+        ('modified_files_ratio', 0),
+        ('new_files_ratio', 0),
+    )
+    _TIME_FEATURE_OFFSET = 7
+    _TIME_FEATURE_COUNT = 4  # hour, weekday, day, month
+    # Below this many string timestamps, parsing each with fromisoformat beats
+    # the fixed cost of a vectorized pd.to_datetime
+    _VECTORIZED_PARSE_MIN = 2048
+    
     def extract_backup_features(self, backup_metadata: Dict) -> np.ndarray:
         """Extract features from backup metadata"""
-        features = []
+        features = [backup_metadata.get(key, default) for key, default in self._FEATURE_SPEC]
+        features[self._TIME_FEATURE_OFFSET:self._TIME_FEATURE_OFFSET] = self._time_fields(
+            backup_metadata.get('timestamp', datetime.now())
+        )
+        return np.array(features, dtype=np.float32)
+    
+    @property
+    def n_features(self) -> int:
+        return len(self._FEATURE_SPEC) + self._TIME_FEATURE_COUNT
+    
+    def extract_backup_features_batch(self, records: List[Dict],
+                                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Extract features from a batch of backup metadata records as an (N, F) matrix
         
-        # File-level features
-        features.extend([
-            backup_metadata.get('file_count', 0),
-            backup_metadata.get('total_size_bytes', 0),
-            backup_metadata.get('compressed_size_bytes', 0),
-            backup_metadata.get('compression_ratio', 0),
-            backup_metadata.get('deduplication_ratio', 0),
-            backup_metadata.get('backup_duration_seconds', 0),
-            backup_metadata.get('throughput_mbps', 0),
-        ])
+        Features are written column by column into ``out`` when given (an
+        (N, F) float32 buffer owned by the caller), otherwise into a new array.
+        """
+        n = len(records)
+        offset = self._TIME_FEATURE_OFFSET
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float32)
+        elif out.shape != (n, self.n_features) or out.dtype != np.float32:
+            raise ValueError(f"out must be a float32 array of shape {(n, self.n_features)}")
         
-        # Time-based features
-        timestamp = backup_metadata.get('timestamp', datetime.now())
-        if isinstance(timestamp, str):
-            timestamp = pd.to_datetime(timestamp)
-            
-        features.extend([
-            timestamp.hour,
-            timestamp.weekday(),
-            timestamp.day,
-            timestamp.month,
-        ])
+        for j, (key, default) in enumerate(self._FEATURE_SPEC):
+            col = j if j < offset else j + self._TIME_FEATURE_COUNT
+            out[:, col] = np.fromiter((r.get(key, default) for r in records), dtype=np.float32, count=n)
         
-        # System resource features
-        features.extend([
-            backup_metadata.get('cpu_usage_percent', 0),
-            backup_metadata.get('memory_usage_percent', 0),
-            backup_metadata.get('disk_io_rate', 0),
-            backup_metadata.get('network_utilization', 0),
-        ])
+        # Time-based features
+        now = datetime.now()
+        timestamps = [r.get('timestamp', now) for r in records]
+        time_columns = out[:, offset:offset + self._TIME_FEATURE_COUNT]
+        if not self._vectorized_time_fields(timestamps, time_columns):
+            time_columns[:] = np.array([self._time_fields(t) for t in timestamps],
+                                       dtype=np.float32).reshape(n, self._TIME_FEATURE_COUNT)
         
-        # Error and retry features
-        features.extend([
-            backup_metadata.get('error_count', 0),
-            backup_metadata.get('retry_count', 0),
-            backup_metadata.get('checksum_failures', 0),
-        ])
+        return out
+    
+    @staticmethod
+    def _time_fields(timestamp) -> Tuple[int, int, int, int]:
+        """(hour, weekday, day, month) of a timestamp's wall-clock time in its own UTC offset"""
+        if not isinstance(timestamp, datetime):
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except (TypeError, ValueError):
+                timestamp = pd.to_datetime(timestamp)  # Formats other than ISO 8601
+        return timestamp.hour, timestamp.weekday(), timestamp.day, timestamp.month
+    
+    def _vectorized_time_fields(self, timestamps: List, out: np.ndarray) -> bool:
+        """Fill the time columns of a large batch of strings with one pd.to_datetime
         
-        # Data integrity features
-        features.extend([
-            backup_metadata.get('file_type_diversity', 0),
-            backup_metadata.get('average_file_size', 0),
-            backup_metadata.get('modified_files_ratio', 0),
-            backup_metadata.get('new_files_ratio', 0),
-        ])
+        Returns False, leaving out untouched, when the batch is small, holds
+        non-strings, or its values do not share one format and UTC offset.
+        """
+        if len(timestamps) < self._VECTORIZED_PARSE_MIN or not all(isinstance(t, str) for t in timestamps):
+            return False
+        try:
+            parsed = pd.to_datetime(pd.Series(timestamps))
+        except ValueError:
+            return False
+        if parsed.dtype == object:  # Mixed UTC offsets; no single datetime column
+            return False
         
-        return np.array(features, dtype=np.float32)
+        fields = parsed.dt
+        out[:, 0] = fields.hour.to_numpy()
+        out[:, 1] = fields.weekday.to_numpy()
+        out[:, 2] = fields.day.to_numpy()
+        out[:, 3] = fields.month.to_numpy()
+        return True
     
     def extract_time_series_features(self, time_series_data: pd.DataFrame) -> np.ndarray:
         """Extract features from time series backup data"""
@@ -107,44 +163,147 @@ class FeatureExtractor:
         ]
         
         # Trend features
-        backup_sizes = time_series_data['backup_size'].values
+        backup_sizes = time_series_data['backup_size'].values.astype(np.float64)
         if len(backup_sizes) > 1:
             features.extend([
-                np.polyfit(range(len(backup_sizes)), backup_sizes, 1)[0],  # Linear trend
-                np.corrcoef(backup_sizes[:-1], backup_sizes[1:])[0, 1],  # Autocorrelation
+                self._linear_trend(backup_sizes),
+                self._pearson(backup_sizes[:-1], backup_sizes[1:]),  # Autocorrelation
             ])
         else:
             features.extend([0, 0])
             
         return np.array(features, dtype=np.float32)
+    
+    @staticmethod
+    def _linear_trend(y: np.ndarray) -> float:
+        """Least-squares slope of y against its index, cov(x, y) / var(x)"""
+        x = np.arange(y.size, dtype=np.float64)
+        x -= x.mean()
+        return float(np.dot(x, y - y.mean()) / np.dot(x, x))
+    
+    @staticmethod
+    def _pearson(a: np.ndarray, b: np.ndarray) -> float:
+        """Pearson correlation of a and b; NaN when either is constant, like np.corrcoef"""
+        a = a - a.mean()
+        b = b - b.mean()
+        denom = np.sqrt(np.dot(a, a) * np.dot(b, b))
+        return float(np.dot(a, b) / denom) if denom > 0 else np.nan
 
 
 class ComprehensiveAnomalyDetector:
     """Main anomaly detection system combining multiple approaches"""
     
+    # Below this many training records the k-NN index is not worth building
+    KNN_MIN_SAMPLES = 10000
+    # PQ sub-quantizer count must divide the 22 backup features
+    KNN_INDEX_FACTORY = "IVF64,PQ11x8"
+    KNN_NPROBE = 8
+    KNN_THRESHOLD_PERCENTILE = 95
+    # Batches smaller than this are scored on the calling thread
+    PARALLEL_SCORING_MIN_BATCH = 1024
+    
     def __init__(self):
         self.feature_extractor = FeatureExtractor()
         self.isolation_forest = None
-        self.ensemble_weights = {'isolation_forest': 1.0}
+        self.knn_index = None
+        self.knn_scaler = None
+        self.knn_threshold = None
+        self.ensemble_weights = {'isolation_forest': 1.0, 'knn': 1.0}
         
     def train(self, backup_data: List[Dict], time_series_data: Optional[pd.DataFrame] = None):
         """Train all anomaly detection models"""
         logger.info("Starting comprehensive anomaly detection training...")
         
-        # Extract features
-        features = np.array([self.feature_extractor.extract_backup_features(data) for data in backup_data])
-        
-        # Train Isolation Forest
-        logger.info("Training Isolation Forest...")
-        self.isolation_forest = IsolationForest(
-            contamination=0.1,
-            random_state=42,
-            n_estimators=200
-        )
-        self.isolation_forest.fit(features)
+        # Extract features straight into one contiguous (N, F) buffer. It stays
+        # float32: byte counts overflow float16 (max 65504), and float32 is the
+        # dtype sklearn's trees consume without conversion.
+        features = np.empty((len(backup_data), self.feature_extractor.n_features), dtype=np.float32)
+        self.feature_extractor.extract_backup_features_batch(backup_data, out=features)
+        
+        if faiss is not None and len(features) >= self.KNN_MIN_SAMPLES:
+            self._train_knn_index(features)
+            self.isolation_forest = None
+        else:
+            # Train Isolation Forest. Each tree only sees max_samples rows, and
+            # fit runs on threads, so workers share the float32 feature matrix
+            # rather than receiving copies of it.
+            logger.info("Training Isolation Forest...")
+            self.isolation_forest = IsolationForest(
+                contamination=0.1,
+                random_state=42,
+                n_estimators=200,
+                max_samples=min(256, len(features)),
+                n_jobs=-1
+            )
+            self.isolation_forest.fit(features)
+            self.knn_index = None
         
         logger.info("Anomaly detection training completed!")
     
+    def _train_knn_index(self, features: np.ndarray):
+        """Build a FAISS IVF-PQ index over standardized features of normal backups"""
+        logger.info("Training FAISS k-NN index...")
+        self.knn_scaler = StandardScaler()
+        X = np.ascontiguousarray(self.knn_scaler.fit_transform(features), dtype=np.float32)
+        
+        index = faiss.index_factory(X.shape[1], self.KNN_INDEX_FACTORY)
+        index.train(X)
+        index.add(X)
+        faiss.extract_index_ivf(index).nprobe = self.KNN_NPROBE
+        
+        # Distance to the nearest other training point (column 0 is the point itself)
+        distances, _ = index.search(X, 2)
+        threshold = np.percentile(np.sqrt(np.maximum(distances[:, 1], 0)), self.KNN_THRESHOLD_PERCENTILE)
+        self.knn_threshold = max(float(threshold), 1e-6)
+        self.knn_index = index
+    
+    def save(self, path: Union[str, Path], compress=0):
+        """Persist the trained detector with joblib
+        
+        Uncompressed files (the default) let load() memory-map the model arrays, so
+        worker processes loading the same file share them instead of copying.
+        Pass e.g. compress=('lz4', 3) for smaller files; those are read fully into
+        memory and must be loaded with mmap_mode=None.
+        """
+        state = {
+            'isolation_forest': self.isolation_forest,
+            'knn_index': faiss.serialize_index(self.knn_index) if self.knn_index is not None else None,
+            'knn_scaler': self.knn_scaler,
+            'knn_threshold': self.knn_threshold,
+            'ensemble_weights': self.ensemble_weights,
+        }
+        joblib.dump(state, path, compress=compress)
+    
+    def load(self, path: Union[str, Path], mmap_mode: Optional[str] = 'r'):
+        """Load a detector written by save()"""
+        state = joblib.load(path, mmap_mode=mmap_mode)
+        self.isolation_forest = state['isolation_forest']
+        self.knn_index = None
+        if state['knn_index'] is not None:
+            self.knn_index = faiss.deserialize_index(np.asarray(state['knn_index']))
+            faiss.extract_index_ivf(self.knn_index).nprobe = self.KNN_NPROBE
+        self.knn_scaler = state['knn_scaler']
+        self.knn_threshold = state['knn_threshold']
+        self.ensemble_weights = state['ensemble_weights']
+    
+    def save_knn_index(self, path: Union[str, Path]):
+        """Persist the k-NN index together with its scaler and threshold"""
+        path = Path(path)
+        faiss.write_index(self.knn_index, str(path))
+        joblib.dump(
+            {'scaler': self.knn_scaler, 'threshold': self.knn_threshold},
+            path.with_suffix('.meta.joblib')
+        )
+    
+    def load_knn_index(self, path: Union[str, Path]):
+        """Load a k-NN index previously written by save_knn_index"""
+        path = Path(path)
+        self.knn_index = faiss.read_index(str(path))
+        faiss.extract_index_ivf(self.knn_index).nprobe = self.KNN_NPROBE
+        meta = joblib.load(path.with_suffix('.meta.joblib'))
+        self.knn_scaler = meta['scaler']
+        self.knn_threshold = meta['threshold']
+    
     def detect_anomalies(self, backup_metadata: Dict, 
                         time_series_data: Optional[pd.DataFrame] = None) -> Dict:
         """Detect anomalies using ensemble approach"""
@@ -170,6 +329,18 @@ class ComprehensiveAnomalyDetector:
             results['anomaly_score'] = if_normalized
             results['is_anomaly'] = if_prediction == -1
         
+        # k-NN distance detection
+        if self.knn_index is not None:
+            scaled = np.ascontiguousarray(self.knn_scaler.transform(features), dtype=np.float32)
+            distances, _ = self.knn_index.search(scaled, 1)
+            distance = float(np.sqrt(max(distances[0, 0], 0)))
+            
+            # Same 0-1 scale as Isolation Forest: 0.5 at the threshold, lower is more anomalous
+            knn_normalized = self.knn_threshold / (distance + self.knn_threshold)
+            results['component_scores']['knn'] = knn_normalized
+            results['anomaly_score'] = knn_normalized
+            results['is_anomaly'] = distance > self.knn_threshold
+        
         # Add detailed analysis
         results['details'] = {
             'timestamp': datetime.now().isoformat(),
@@ -180,6 +351,53 @@ class ComprehensiveAnomalyDetector:
         }
         
         return results
+    
+    def detect_anomalies_batch(self, records: List[Dict]) -> Dict:
+        """Detect anomalies for a batch of backups with one scoring pass per model"""
+        features = self.feature_extractor.extract_backup_features_batch(records)
+        results = {
+            'is_anomaly': np.zeros(len(records), dtype=bool),
+            'anomaly_score': np.zeros(len(records)),
+            'component_scores': {}
+        }
+        
+        if self.isolation_forest is not None:
+            if_scores = self._isolation_forest_scores(features)
+            if_normalized = np.maximum(0, 1 - (-if_scores + 1) / 2)
+            results['component_scores']['isolation_forest'] = if_normalized
+            results['anomaly_score'] = if_normalized
+            results['is_anomaly'] = if_scores < 0  # same rule as predict() == -1
+        
+        if self.knn_index is not None:
+            scaled = np.ascontiguousarray(self.knn_scaler.transform(features), dtype=np.float32)
+            distances, _ = self.knn_index.search(scaled, 1)
+            distances = np.sqrt(np.maximum(distances[:, 0], 0))
+            knn_normalized = self.knn_threshold / (distances + self.knn_threshold)
+            results['component_scores']['knn'] = knn_normalized
+            results['anomaly_score'] = knn_normalized
+            results['is_anomaly'] = distances > self.knn_threshold
+        
+        return results
+    
+    def _isolation_forest_scores(self, features: np.ndarray) -> np.ndarray:
+        """decision_function over row chunks scored on parallel threads
+        
+        The estimator's n_jobs only parallelizes fit; scoring walks the trees
+        serially, so large batches are split by rows instead. Only the per-tree
+        apply and decision_path calls release the GIL; score_samples' Python
+        loop over estimators holds it, so the threads overlap only part of the
+        work. The speedup has not been benchmarked.
+        """
+        n_jobs = joblib.effective_n_jobs(-1)
+        if len(features) < self.PARALLEL_SCORING_MIN_BATCH or n_jobs == 1:
+            return self.isolation_forest.decision_function(features)
+        
+        chunks = np.array_split(features, n_jobs)
+        with joblib.parallel_backend('threading', n_jobs=n_jobs):
+            scores = joblib.Parallel()(
+                joblib.delayed(self.isolation_forest.decision_function)(chunk) for chunk in chunks
+            )
+        return np.concatenate(scores)
 
 
 if __name__ == "__main__":
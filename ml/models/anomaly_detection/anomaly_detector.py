@@ -1,10 +1,31 @@
+import joblib
 import tensorflow as tf
 from tensorflow.keras import layers, models
 import numpy as np
 
+def quantize_int8(x):
+    """Quantize each row of x to int8 with a per-row symmetric scale (max |x| / 127)"""
+    x = np.atleast_2d(np.asarray(x, dtype=np.float32))
+    scale = np.abs(x).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.rint(x / scale[:, None]).astype(np.int8)
+    return q, scale
+
+def int8_mse(q, scale, kq, kscale):
+    """Per-row MSE between two int8-quantized batches, accumulated exactly in int32"""
+    # einsum accumulates the int8 inputs in int32 directly, without upcast copies
+    qq = np.einsum('ij,ij->i', q, q, dtype=np.int32)
+    kk = np.einsum('ij,ij->i', kq, kq, dtype=np.int32)
+    qk = np.einsum('ij,ij->i', q, kq, dtype=np.int32)
+    scale = scale.astype(np.float64)
+    kscale = kscale.astype(np.float64)
+    ssd = scale**2 * qq + kscale**2 * kk - 2 * scale * kscale * qk
+    return np.maximum(ssd, 0) / q.shape[1]
+
 class AnomalyDetector:
     def __init__(self):
         self.autoencoder = self._build_autoencoder()
+        self.refresh_inference_weights()
         self.threshold = 0.05 # Example threshold, determined from validation data
     
     def _build_autoencoder(self):
@@ -27,6 +48,49 @@ class AnomalyDetector:
         print("Autoencoder compiled successfully.")
         return autoencoder
     
+    def save(self, path, compress=0):
+        """Save the autoencoder weights and threshold with joblib
+        
+        Uncompressed files (the default) can be memory-mapped by load(); files
+        written with e.g. compress=('lz4', 3) must be loaded with mmap_mode=None.
+        """
+        state = {'weights': self.autoencoder.get_weights(), 'threshold': self.threshold}
+        joblib.dump(state, path, compress=compress)
+    
+    def load(self, path, mmap_mode='r'):
+        """Load weights written by save() into the autoencoder"""
+        state = joblib.load(path, mmap_mode=mmap_mode)
+        self.autoencoder.set_weights(state['weights'])
+        self.refresh_inference_weights()
+        self.threshold = state['threshold']
+    
+    def refresh_inference_weights(self):
+        """Snapshot the Dense kernels and biases for _forward
+        
+        _forward re-snapshots on its own once the optimizer has taken a step, so
+        this is only needed after changing the weights without training, as
+        set_weights does.
+        """
+        self._snapshot_step = int(self.autoencoder.optimizer.iterations)
+        self._dense_params = [
+            (np.ascontiguousarray(kernel, dtype=np.float32), np.ascontiguousarray(bias, dtype=np.float32))
+            for kernel, bias in (layer.get_weights() for layer in self.autoencoder.layers if layer.weights)
+        ]
+    
+    def _forward(self, x):
+        """Autoencoder forward pass as plain matmuls: ReLU on every layer but the sigmoid output"""
+        # Training in place (autoencoder.fit) advances the step counter
+        if int(self.autoencoder.optimizer.iterations) != self._snapshot_step:
+            self.refresh_inference_weights()
+        *hidden, (kernel_out, bias_out) = self._dense_params
+        for kernel, bias in hidden:
+            x = x @ kernel
+            x += bias
+            np.maximum(x, 0, out=x)
+        x = x @ kernel_out
+        x += bias_out
+        return 1 / (1 + np.exp(-x))
+    
     def _extract_features(self, backup_metadata):
         # In a real scenario, this would create a feature vector from metadata
         print("Extracting features from backup metadata...")
@@ -36,8 +100,11 @@ class AnomalyDetector:
         """Detect potential data corruption in backups"""
         features = self._extract_features(backup_metadata)
         print("Detecting potential corruption...")
-        reconstruction = self.autoencoder.predict(features)
-        mse = np.mean(np.power(features - reconstruction, 2), axis=1)
+        reconstruction = self._forward(features)
+        # Score in int8; the autoencoder itself stays float32
+        q, scale = quantize_int8(features)
+        kq, kscale = quantize_int8(reconstruction)
+        mse = int8_mse(q, scale, kq, kscale)
         
         is_anomaly = mse[0] > self.threshold
         print(f"Reconstruction error (MSE): {mse[0]:.6f}, Anomaly detected: {is_anomaly}")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test suite for the advanced anomaly detector's feature extraction
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from advanced_anomaly_detector import FeatureExtractor
+
+
+TIME_COLUMNS = slice(FeatureExtractor._TIME_FEATURE_OFFSET,
+                     FeatureExtractor._TIME_FEATURE_OFFSET + FeatureExtractor._TIME_FEATURE_COUNT)
+
+def wall_clock_fields(timestamp):
+    """(hour, weekday, day, month) of one timestamp parsed on its own"""
+    timestamp = pd.to_datetime(timestamp)
+    return [timestamp.hour, timestamp.weekday(), timestamp.day, timestamp.month]
+
+class TestFeatureExtractor:
+    """Test batched backup feature extraction"""
+
+    @pytest.mark.parametrize("timestamps", [
+        # One shared offset
+        ['2024-03-04T23:30:00+02:00', '2024-07-14T01:15:00+02:00'],
+        # Mixed offsets, which pandas cannot put in one datetime column
+        ['2024-03-04T23:30:00+02:00', '2024-03-04T23:30:00-05:00', '2024-12-31T22:00:00Z'],
+        # Mixed offsets alongside a naive datetime
+        ['2024-03-04T23:30:00+02:00', '2024-03-04T23:30:00-05:00', datetime(2024, 6, 1, 8)],
+    ])
+    def test_time_features_use_each_records_wall_clock(self, timestamps):
+        """Test batched time features match parsing each record on its own"""
+        records = [{'timestamp': timestamp, 'file_count': i} for i, timestamp in enumerate(timestamps)]
+        features = FeatureExtractor().extract_backup_features_batch(records)
+
+        assert features.shape == (len(records), FeatureExtractor().n_features)
+        assert features[:, TIME_COLUMNS].tolist() == [wall_clock_fields(t) for t in timestamps]
+        assert features[:, 0].tolist() == list(range(len(records)))
+
+    def test_single_record_matches_batch(self):
+        """Test the per-record entry point agrees with the batch"""
+        extractor = FeatureExtractor()
+        records = [{'timestamp': '2024-03-04T23:30:00+02:00'}, {'timestamp': '2024-03-04T23:30:00-05:00'}]
+        batch = extractor.extract_backup_features_batch(records)
+        for record, row in zip(records, batch):
+            assert extractor.extract_backup_features(record).tolist() == row.tolist()
+
+    def test_large_batch_matches_per_record_parsing(self):
+        """Test the vectorized parse of a large string batch matches parsing each record"""
+        timestamps = [f'2024-{m:02d}-{d:02d}T{h:02d}:30:00+02:00'
+                      for m in (1, 6, 12) for d in (1, 15, 28) for h in range(24)]
+        timestamps *= FeatureExtractor._VECTORIZED_PARSE_MIN // len(timestamps) + 1
+        features = FeatureExtractor().extract_backup_features_batch([{'timestamp': t} for t in timestamps])
+
+        assert features[:, TIME_COLUMNS].tolist() == [wall_clock_fields(t) for t in timestamps]
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test suite for the autoencoder anomaly detector's NumPy inference path
+"""
+
+import numpy as np
+
+from anomaly_detector import AnomalyDetector
+
+
+class TestAnomalyDetector:
+    """Test that _forward tracks the Keras autoencoder's current weights"""
+
+    def test_forward_follows_training(self):
+        """Test training in place, then detecting, scores with the trained weights"""
+        rng = np.random.default_rng(0)
+        detector = AnomalyDetector()
+        features = rng.random((4, 512), dtype=np.float32)
+        before = detector._forward(features)
+
+        x = rng.random((64, 512), dtype=np.float32)
+        detector.autoencoder.fit(x, x, epochs=1, batch_size=16, verbose=0)
+
+        after = detector._forward(features)
+        assert not np.allclose(after, before)
+        np.testing.assert_allclose(after, detector.autoencoder.predict(features, verbose=0), atol=1e-6)
+        assert isinstance(detector.detect_corruption({}), (bool, np.bool_))
+
+    def test_forward_follows_load(self, tmp_path):
+        """Test loaded weights replace the snapshot"""
+        rng = np.random.default_rng(1)
+        trained = AnomalyDetector()
+        x = rng.random((64, 512), dtype=np.float32)
+        trained.autoencoder.fit(x, x, epochs=1, batch_size=16, verbose=0)
+        path = str(tmp_path / 'autoencoder.joblib')
+        trained.save(path)
+
+        loaded = AnomalyDetector()
+        loaded.load(path)
+        features = rng.random((2, 512), dtype=np.float32)
+        np.testing.assert_allclose(loaded._forward(features), trained._forward(features), atol=1e-6)
@@ -9,6 +9,7 @@ This module implements sophisticated machine learning models for:
 - Adaptive scheduling based on user behavior and system load
 """
 
+import functools
 import logging
 import warnings
 from datetime import datetime, timedelta
@@ -18,15 +19,81 @@ from typing import Dict, List, Optional, Tuple, Union
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, MinMaxScaler
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; temporal features fall back to NumPy
+    njit = None
+
 warnings.filterwarnings('ignore', category=FutureWarning)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One record per predicted hour, as returned in predict_optimal_windows()['predictions']
+PREDICTION_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[us]'),
+    ('hour', np.int8),
+    ('quality_score', np.float64),
+    ('recommended', np.bool_),
+])
+
+TEMPORAL_FEATURE_COLUMNS = (
+    'hour', 'day_of_week', 'day_of_month', 'month', 'quarter',
+    'is_weekend', 'is_business_hours',
+    'hour_sin', 'hour_cos', 'day_sin', 'day_cos',
+)
+
+# Cyclical encodings only take 24 (hour) and 7 (weekday) distinct values
+_HOUR_SIN = np.sin(2 * np.pi * np.arange(24) / 24)
+_HOUR_COS = np.cos(2 * np.pi * np.arange(24) / 24)
+_DAY_SIN = np.sin(2 * np.pi * np.arange(7) / 7)
+_DAY_COS = np.cos(2 * np.pi * np.arange(7) / 7)
+
+
+def _temporal_features_numpy(hour, weekday, day, month, out):
+    """Fill out with the TEMPORAL_FEATURE_COLUMNS for each timestamp"""
+    out[:, 0] = hour
+    out[:, 1] = weekday
+    out[:, 2] = day
+    out[:, 3] = month
+    out[:, 4] = (month - 1) // 3 + 1
+    out[:, 5] = weekday >= 5
+    out[:, 6] = (hour >= 9) & (hour <= 17)
+    
+    # Cyclical encoding for time features
+    out[:, 7] = _HOUR_SIN[hour]
+    out[:, 8] = _HOUR_COS[hour]
+    out[:, 9] = _DAY_SIN[weekday]
+    out[:, 10] = _DAY_COS[weekday]
+    return out
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _temporal_kernel(hour, weekday, day, month, out):
+        """Fused single-pass version of _temporal_features_numpy"""
+        for i in range(hour.shape[0]):
+            h = hour[i]
+            wd = weekday[i]
+            out[i, 0] = h
+            out[i, 1] = wd
+            out[i, 2] = day[i]
+            out[i, 3] = month[i]
+            out[i, 4] = (month[i] - 1) // 3 + 1
+            out[i, 5] = 1.0 if wd >= 5 else 0.0
+            out[i, 6] = 1.0 if 9 <= h <= 17 else 0.0
+            out[i, 7] = _HOUR_SIN[h]
+            out[i, 8] = _HOUR_COS[h]
+            out[i, 9] = _DAY_SIN[wd]
+            out[i, 10] = _DAY_COS[wd]
+        return out
+else:
+    _temporal_kernel = _temporal_features_numpy
+
 
 class AdvancedFeatureExtractor:
     """Extract comprehensive features for backup prediction"""
@@ -37,34 +104,50 @@ class AdvancedFeatureExtractor:
         
     def extract_temporal_features(self, timestamps: pd.Series) -> pd.DataFrame:
         """Extract time-based features"""
-        df = pd.DataFrame()
-        
-        df['hour'] = timestamps.dt.hour
-        df['day_of_week'] = timestamps.dt.dayofweek
-        df['day_of_month'] = timestamps.dt.day
-        df['month'] = timestamps.dt.month
-        df['quarter'] = timestamps.dt.quarter
-        df['is_weekend'] = (timestamps.dt.dayofweek >= 5).astype(int)
-        df['is_business_hours'] = ((timestamps.dt.hour >= 9) & (timestamps.dt.hour <= 17)).astype(int)
-        
-        # Cyclical encoding for time features
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-        
-        return df
+        return pd.DataFrame(
+            self.temporal_feature_matrix(timestamps),
+            columns=list(TEMPORAL_FEATURE_COLUMNS),
+            index=timestamps.index
+        )
+    
+    @staticmethod
+    def temporal_feature_matrix(timestamps: Union[pd.Series, pd.DatetimeIndex]) -> np.ndarray:
+        """Extract time-based features as an (N, 11) matrix without building a DataFrame"""
+        timestamps = pd.DatetimeIndex(timestamps)
+        out = np.empty((len(timestamps), len(TEMPORAL_FEATURE_COLUMNS)))
+        return _temporal_kernel(
+            timestamps.hour.to_numpy(np.int32),
+            timestamps.weekday.to_numpy(np.int32),
+            timestamps.day.to_numpy(np.int32),
+            timestamps.month.to_numpy(np.int32),
+            out
+        )
+
+
+@functools.lru_cache(maxsize=64)
+def _temporal_block(start_hour: datetime, horizon: int) -> np.ndarray:
+    """Temporal features for `horizon` hourly steps from `start_hour`, cached and read-only
+    
+    The features only depend on the hour the horizon starts in, so every request
+    within the same hour reuses the same block.
+    """
+    timestamps = pd.date_range(start=start_hour, periods=horizon, freq='H')
+    block = AdvancedFeatureExtractor.temporal_feature_matrix(timestamps)
+    block.flags.writeable = False
+    return block
 
 
 class OptimalWindowPredictor:
     """Predict optimal backup windows using ensemble methods"""
     
     def __init__(self):
+        # Histogram-based boosting bins each feature once, so fit and predict are far
+        # cheaper than a 200-tree forest; tree splits also make feature scaling unnecessary
         self.models = {
-            'random_forest': RandomForestRegressor(n_estimators=200, random_state=42),
-            'gradient_boosting': GradientBoostingRegressor(n_estimators=200, random_state=42)
+            'hist_gradient_boosting': HistGradientBoostingRegressor(
+                max_iter=200, early_stopping=True, random_state=42
+            )
         }
-        self.feature_scaler = StandardScaler()
         self.target_scaler = MinMaxScaler()
         self.feature_importance = {}
         
@@ -93,13 +176,12 @@ class OptimalWindowPredictor:
         
         X, y = self.prepare_training_data(historical_data)
         
-        # Scale features
-        X_scaled = self.feature_scaler.fit_transform(X)
+        # Scale target
         y_scaled = self.target_scaler.fit_transform(y.reshape(-1, 1)).ravel()
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y_scaled, test_size=0.2, random_state=42
+            X, y_scaled, test_size=0.2, random_state=42
         )
         
         # Train models
@@ -123,61 +205,52 @@ class OptimalWindowPredictor:
     def predict_optimal_windows(self, current_data: Dict, prediction_horizon: int = 24) -> Dict:
         """Predict optimal backup windows for the next N hours"""
         # Generate future timestamps
+        now = datetime.now()
         future_timestamps = pd.date_range(
-            start=datetime.now(),
+            start=now,
             periods=prediction_horizon,
             freq='H'
         )
         
-        predictions = []
+        hours = future_timestamps.hour.to_numpy()
+        temporal_features = _temporal_block(
+            now.replace(minute=0, second=0, microsecond=0), prediction_horizon
+        )
         
-        for timestamp in future_timestamps:
-            # Create feature vector for this time point
-            features = []
-            
-            # Temporal features
-            features.extend([
-                timestamp.hour,
-                timestamp.weekday(),
-                timestamp.day,
-                timestamp.month,
-                timestamp.quarter,
-                1 if timestamp.weekday() >= 5 else 0,  # is_weekend
-                1 if 9 <= timestamp.hour <= 17 else 0,  # is_business_hours
-                np.sin(2 * np.pi * timestamp.hour / 24),  # hour_sin
-                np.cos(2 * np.pi * timestamp.hour / 24),  # hour_cos
-                np.sin(2 * np.pi * timestamp.weekday() / 7),  # day_sin
-                np.cos(2 * np.pi * timestamp.weekday() / 7),  # day_cos
-            ])
-            
-            # Current system and user data (use provided or defaults)
-            features.extend([
-                current_data.get('system_load', 0.5),
-                current_data.get('user_activity', 0.3),
-                current_data.get('backup_success_rate', 0.95),
-                current_data.get('resource_availability', 0.8),
-            ])
-            
-            feature_vector = np.array(features).reshape(1, -1)
-            feature_vector_scaled = self.feature_scaler.transform(feature_vector)
-            
-            # Ensemble prediction
-            ensemble_pred = 0
-            for model in self.models.values():
-                pred = model.predict(feature_vector_scaled)[0]
-                ensemble_pred += pred
-            
-            ensemble_pred /= len(self.models)
-            
-            # Scale back to original range
-            final_pred = self.target_scaler.inverse_transform([[ensemble_pred]])[0][0]
-            
-            predictions.append({
-                'timestamp': timestamp.isoformat(),
-                'hour': timestamp.hour,
-                'quality_score': float(final_pred),
-                'recommended': final_pred > 0.7  # Threshold for recommendation
-            })
+        # Current system and user data (use provided or defaults), same for every hour
+        current_features = np.array([
+            current_data.get('system_load', 0.5),
+            current_data.get('user_activity', 0.3),
+            current_data.get('backup_success_rate', 0.95),
+            current_data.get('resource_availability', 0.8),
+        ])
+        
+        feature_matrix = np.hstack([
+            temporal_features,
+            np.broadcast_to(current_features, (prediction_horizon, current_features.size))
+        ])
+        
+        # Ensemble prediction, averaged over models. A single model is called directly,
+        # since dispatching one predict through joblib only adds overhead.
+        models = list(self.models.values())
+        if len(models) == 1:
+            ensemble_pred = models[0].predict(feature_matrix)
+        else:
+            # (M, H) stack of per-model predictions; tree predict releases the GIL,
+            # so the models run concurrently on threads
+            model_preds = np.vstack(joblib.Parallel(n_jobs=len(models), prefer='threads')(
+                joblib.delayed(model.predict)(feature_matrix) for model in models
+            ))
+            ensemble_pred = model_preds.mean(axis=0)
+        
+        # Scale back to original range
+        final_preds = self.target_scaler.inverse_transform(ensemble_pred.reshape(-1, 1)).ravel()
+        
+        predictions = np.empty(prediction_horizon, dtype=PREDICTION_DTYPE)
+        predictions['timestamp'] = future_timestamps.to_numpy()
+        predictions['hour'] = hours
+        predictions['quality_score'] = final_preds
+        predictions['recommended'] = final_preds > 0.7  # Threshold for recommendation
         
         # Find optimal windows (consecutive high-quality periods)
         optimal_windows = self._find_optimal_windows(predictions)
@@ -189,32 +262,40 @@ class OptimalWindowPredictor:
             'prediction_horizon_hours': prediction_horizon
         }
     
-    def _find_optimal_windows(self, predictions: List[Dict], min_duration: int = 2) -> List[Dict]:
+    def _find_optimal_windows(self, predictions: np.ndarray, min_duration: int = 2) -> List[Dict]:
         """Find consecutive high-quality backup windows"""
-        windows = []
-        current_window = None
+        # Run boundaries of the recommended mask: +1 where a run starts, -1 one past its end
+        edges = np.diff(predictions['recommended'].astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
         
-        for pred in predictions:
-            if pred['recommended']:
-                if current_window is None:
-                    current_window = {
-                        'start_time': pred['timestamp'],
-                        'start_hour': pred['hour'],
-                        'scores': [pred['quality_score']]
-                    }
-                else:
-                    current_window['scores'].append(pred['quality_score'])
-            else:
-                if current_window is not None and len(current_window['scores']) >= min_duration:
-                    current_window['end_time'] = predictions[predictions.index(pred) - 1]['timestamp']
-                    current_window['end_hour'] = predictions[predictions.index(pred) - 1]['hour']
-                    current_window['duration_hours'] = len(current_window['scores'])
-                    current_window['avg_quality'] = np.mean(current_window['scores'])
-                    windows.append(current_window)
-                current_window = None
+        long_enough = (ends - starts) >= min_duration
+        starts, ends = starts[long_enough], ends[long_enough]
+        if starts.size == 0:
+            return []
         
-        # Sort by quality score
-        windows.sort(key=lambda x: x['avg_quality'], reverse=True)
+        # np.mean per run over a contiguous copy, as the list-based version did: a
+        # reduceat sum divided by the length rounds differently, and tied windows
+        # would then swap places
+        scores = np.ascontiguousarray(predictions['quality_score'])
+        avg_quality = np.array([scores[start:end].mean() for start, end in zip(starts, ends)])
+        
+        timestamps = pd.DatetimeIndex(predictions['timestamp'])
+        hours = predictions['hour']
+        
+        # Highest average quality first; stable so ties keep chronological order
+        windows = []
+        for k in np.argsort(-avg_quality, kind='stable'):
+            start, last = starts[k], ends[k] - 1
+            windows.append({
+                'start_time': timestamps[start].isoformat(),
+                'start_hour': int(hours[start]),
+                'scores': scores[start:last + 1].tolist(),
+                'end_time': timestamps[last].isoformat(),
+                'end_hour': int(hours[last]),
+                'duration_hours': int(ends[k] - starts[k]),
+                'avg_quality': float(avg_quality[k]),
+            })
         
         return windows
 
@@ -12,6 +12,8 @@ class FeatureExtractor:
 class BackupPredictor:
     def __init__(self):
         self.model = self._build_model()
+        self.infer = self._build_inference_fn()
+        self.tflite_interpreter = None
         self.feature_extractor = FeatureExtractor()
     
     def _build_model(self):
@@ -30,11 +32,54 @@ class BackupPredictor:
         model.compile(
             optimizer='adam',
             loss='binary_crossentropy',
-            metrics=['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall()]
+            metrics=['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall()],
+            jit_compile=True  # XLA fuses the LSTM gate ops over the short 168-step sequence
         )
         print("Model compiled successfully.")
         return model
     
+    def _build_inference_fn(self):
+        """Trace the model once so inference skips Model.predict's per-call overhead"""
+        infer = tf.function(self._forward, jit_compile=True)
+        return infer.get_concrete_function(tf.TensorSpec((None, 168, 15), tf.float32))
+    
+    def _forward(self, x):
+        return self.model(x, training=False)
+    
+    def export_tflite(self, representative_data=None):
+        """Convert the model to TFLite with post-training quantization for deployment
+        
+        With representative_data (an iterable of (168, 15) samples) activations are
+        calibrated so supported ops run in int8; otherwise only weights are quantized.
+        The converted interpreter is then used by predict_optimal_backup_windows.
+        """
+        print("Converting LSTM model to TFLite...")
+        # A static batch dimension lets the converter fuse the LSTMs into TFLite builtins
+        single_sample = tf.function(self._forward).get_concrete_function(
+            tf.TensorSpec((1, 168, 15), tf.float32)
+        )
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([single_sample], self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if representative_data is not None:
+            converter.representative_dataset = lambda: (
+                [np.asarray(sample, dtype=np.float32)[np.newaxis]] for sample in representative_data
+            )
+        tflite_model = converter.convert()
+        
+        self.tflite_interpreter = tf.lite.Interpreter(model_content=tflite_model)
+        self.tflite_interpreter.allocate_tensors()
+        self._tflite_input = self.tflite_interpreter.get_input_details()[0]['index']
+        self._tflite_output = self.tflite_interpreter.get_output_details()[0]['index']
+        print("TFLite model ready.")
+        return tflite_model
+    
+    def _run_model(self, features):
+        if self.tflite_interpreter is not None:
+            self.tflite_interpreter.set_tensor(self._tflite_input, features)
+            self.tflite_interpreter.invoke()
+            return self.tflite_interpreter.get_tensor(self._tflite_output)
+        return self.infer(tf.constant(features)).numpy()
+    
     def _post_process_predictions(self, predictions):
         # Example: Return hours where prediction > 0.7
         optimal_hours = np.where(predictions[0] > 0.7)[0]
@@ -43,5 +88,5 @@ class BackupPredictor:
     def predict_optimal_backup_windows(self, user_patterns, system_load):
         features = self.feature_extractor.extract(user_patterns, system_load)
         print("Predicting optimal backup windows...")
-        predictions = self.model.predict(features)
+        predictions = self._run_model(features)
         return self._post_process_predictions(predictions)
\ No newline at end of file
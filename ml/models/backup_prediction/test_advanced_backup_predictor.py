@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test suite for the advanced backup predictor's temporal features and window search
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from advanced_backup_predictor import (
+    PREDICTION_DTYPE, TEMPORAL_FEATURE_COLUMNS, OptimalWindowPredictor, _temporal_block
+)
+
+
+def make_predictions(scores, start=datetime(2024, 3, 9, 22)):
+    """Hourly prediction records with the given quality scores"""
+    timestamps = pd.date_range(start=start, periods=len(scores), freq='H')
+    predictions = np.empty(len(scores), dtype=PREDICTION_DTYPE)
+    predictions['timestamp'] = timestamps.to_numpy()
+    predictions['hour'] = timestamps.hour.to_numpy()
+    predictions['quality_score'] = scores
+    predictions['recommended'] = np.asarray(scores) > 0.7
+    return predictions
+
+def reference_windows(predictions, min_duration=2):
+    """Windows found one record at a time, as the list-of-dicts implementation did"""
+    windows, run = [], []
+    for i, record in enumerate(predictions.tolist() + [None]):
+        if record is not None and record[3]:
+            run.append(i)
+            continue
+        if len(run) >= min_duration:
+            scores = [float(predictions['quality_score'][j]) for j in run]
+            windows.append((int(predictions['hour'][run[0]]), int(predictions['hour'][run[-1]]),
+                            len(run), np.mean(scores)))
+        run = []
+    windows.sort(key=lambda window: window[3], reverse=True)
+    return windows
+
+class TestTemporalBlock:
+    """Test the cached horizon feature block"""
+
+    def test_block_matches_per_hour_features(self):
+        """Test each row holds the TEMPORAL_FEATURE_COLUMNS of its hour"""
+        start = datetime(2024, 3, 9, 22)  # Saturday evening, crossing into Sunday
+        block = _temporal_block(start, 4)
+        assert block.shape == (4, len(TEMPORAL_FEATURE_COLUMNS))
+
+        for row, timestamp in zip(block, pd.date_range(start=start, periods=4, freq='H')):
+            hour, weekday = timestamp.hour, timestamp.weekday()
+            assert row[:7].tolist() == [
+                hour, weekday, timestamp.day, timestamp.month, (timestamp.month - 1) // 3 + 1,
+                weekday >= 5, 9 <= hour <= 17
+            ]
+            assert row[7:].tolist() == pytest.approx([
+                np.sin(2 * np.pi * hour / 24), np.cos(2 * np.pi * hour / 24),
+                np.sin(2 * np.pi * weekday / 7), np.cos(2 * np.pi * weekday / 7)
+            ])
+
+    def test_block_is_cached_and_read_only(self):
+        """Test requests in the same hour share one block that cannot be modified"""
+        block = _temporal_block(datetime(2024, 6, 3, 10), 24)
+        assert _temporal_block(datetime(2024, 6, 3, 10), 24) is block
+        with pytest.raises(ValueError):
+            block[0, 0] = -1
+
+class TestFindOptimalWindows:
+    """Test the vectorized consecutive-window search"""
+
+    def test_windows_ranked_with_trailing_window(self):
+        """Test runs are found, ranked by mean quality, and one ending the horizon is kept"""
+        scores = [0.9, 0.8, 0.2, 0.75, 0.1, 0.95, 0.3, 0.85, 0.85, 0.8]
+        predictions = make_predictions(scores)
+        windows = OptimalWindowPredictor()._find_optimal_windows(predictions)
+
+        # The single-hour runs at indices 3 and 5 are shorter than min_duration
+        assert [(w['start_hour'], w['end_hour'], w['duration_hours']) for w in windows] == [
+            (22, 23, 2), (5, 7, 3)
+        ]
+        trailing = windows[1]
+        assert trailing['scores'] == scores[7:]
+        assert trailing['end_time'] == pd.Timestamp(predictions['timestamp'][-1]).isoformat()
+        assert trailing['avg_quality'] == np.mean(scores[7:])
+
+    def test_no_windows(self):
+        """Test a horizon without a long enough recommended run yields no windows"""
+        predictions = make_predictions([0.9, 0.2, 0.95, 0.1])
+        assert OptimalWindowPredictor()._find_optimal_windows(predictions) == []
+
+    def test_matches_reference_with_ties(self):
+        """Test averages and ordering, tied windows included, match the per-record search"""
+        rng = np.random.default_rng(0)
+        predictor = OptimalWindowPredictor()
+        for _ in range(500):
+            # Few distinct values, so many windows tie or differ only by rounding
+            scores = rng.choice([0.1, 0.75, 0.8, 0.85, 0.9, 0.95], size=24).tolist()
+            predictions = make_predictions(scores)
+            windows = predictor._find_optimal_windows(predictions)
+            assert [
+                (w['start_hour'], w['end_hour'], w['duration_hours'], w['avg_quality']) for w in windows
+            ] == reference_windows(predictions)
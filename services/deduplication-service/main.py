@@ -6,19 +6,25 @@ and multiple hashing algorithms for optimal storage efficiency.
 """
 
 import asyncio
+import inspect
 import logging
+import os
 import signal
 import sys
 from contextlib import asynccontextmanager
+from typing import Any, Dict, Tuple
 
+import blake3
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from prometheus_client import make_asgi_app
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from prometheus_client import Counter, make_asgi_app
+from pydantic import BaseModel, Field, Json, ValidationError
 import structlog
 
 from deduplication import DeduplicationEngine
 from models import ChunkRequest, ChunkResponse, DeduplicationStats
 from config import Settings
+from refcounts import ReferenceCountBuffer
 
 
 # Configure structured logging
@@ -44,28 +50,70 @@ logger = structlog.get_logger()
 
 # Global deduplication engine
 dedup_engine = None
+refcount_buffer = None
+
+# Chunks at least this large are hashed with BLAKE3's multithreaded mode
+BLAKE3_MULTITHREAD_MIN_SIZE = 1024 * 1024
+
+# Larger /deduplicate bodies are refused with 413 instead of being buffered
+MAX_CHUNK_BODY_SIZE = int(os.getenv("MAX_CHUNK_BODY_SIZE", str(16 * 1024 * 1024)))
+
+# Per-request accounting; the uvicorn access log is disabled
+chunks_processed = Counter(
+    'dedup_chunks_processed_total', 'Chunks processed by /deduplicate', ['duplicate']
+)
+
+
+class ChunkHeaders(BaseModel):
+    """
+    Chunk identity and metadata, sent as X-Chunk-Id / X-Chunk-Metadata
+    headers alongside the raw chunk body
+    """
+    chunk_id: str = Field(min_length=1)
+    metadata: Json[Dict[str, Any]] = "{}"
+
+
+def check_engine_accepts_hash(engine):
+    """
+    Fail at startup, not on every /deduplicate call, if the engine's
+    process_chunk cannot take the handler's precomputed BLAKE3 hash_value
+    """
+    parameters = inspect.signature(engine.process_chunk).parameters.values()
+    if not any(p.name == "hash_value" or p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters):
+        raise RuntimeError(
+            "DeduplicationEngine.process_chunk does not accept hash_value; "
+            "it must key chunks by the BLAKE3 digest computed in /deduplicate"
+        )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global dedup_engine
+    global dedup_engine, refcount_buffer
     
     logger.info("Starting CoreState Deduplication Service")
     
     # Initialize deduplication engine
     settings = Settings()
     dedup_engine = DeduplicationEngine(settings)
+    check_engine_accepts_hash(dedup_engine)
     await dedup_engine.initialize()
     
+    refcount_buffer = ReferenceCountBuffer(dedup_engine.update_reference_count)
+    
     # Start background tasks
     cleanup_task = asyncio.create_task(dedup_engine.cleanup_expired_chunks())
+    refcount_task = asyncio.create_task(refcount_buffer.run())
     
     yield
     
     # Cleanup on shutdown
     logger.info("Shutting down Deduplication Service")
     cleanup_task.cancel()
+    try:
+        await refcount_buffer.drain(refcount_task)
+    except Exception as e:
+        logger.error("Failed to flush reference counts on shutdown", error=str(e))
     await dedup_engine.close()
 
 
@@ -98,35 +146,117 @@ async def health_check():
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 
+def content_hash(data: bytes) -> str:
+    """
+    BLAKE3 hex digest of a chunk, the chunk id format used in shared/proto
+    """
+    if len(data) >= BLAKE3_MULTITHREAD_MIN_SIZE:
+        return blake3.blake3(data, max_threads=blake3.blake3.AUTO).hexdigest()
+    return blake3.blake3(data).hexdigest()
+
+
+def is_json_body(request: Request) -> bool:
+    """Whether a /deduplicate request carries a JSON ChunkRequest rather than the raw chunk"""
+    return request.headers.get("content-type", "").startswith("application/json")
+
+
+async def read_body(request: Request, hasher=None) -> bytes:
+    """
+    Read a /deduplicate body of at most MAX_CHUNK_BODY_SIZE bytes, feeding
+    each piece to hasher as it arrives
+
+    Raises 413 as soon as the declared or received size exceeds the limit.
+    The pieces are joined once, into the single buffer handed to the engine.
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Chunk body exceeds {MAX_CHUNK_BODY_SIZE} bytes"
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_CHUNK_BODY_SIZE:
+        raise too_large
+
+    pieces, size = [], 0
+    async for piece in request.stream():
+        size += len(piece)
+        if size > MAX_CHUNK_BODY_SIZE:
+            raise too_large
+        if hasher is not None:
+            hasher.update(piece)
+        pieces.append(piece)
+    return b"".join(pieces)
+
+
+async def read_chunk(request: Request) -> Tuple[str, Dict[str, Any], bytes, str]:
+    """
+    Read (chunk_id, metadata, data, hash_value) from a /deduplicate request
+
+    A JSON body is a ChunkRequest, as sent by existing clients. Any other
+    body is the raw chunk, with its id and metadata in the X-Chunk-Id and
+    X-Chunk-Metadata headers; it is hashed with BLAKE3 (the chunk id format
+    used in shared/proto) as it streams in, skipping JSON and bytes
+    validation of the payload.
+    """
+    if is_json_body(request):
+        try:
+            chunk = ChunkRequest.model_validate_json(await read_body(request))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+        # A str field carries the same UTF-8 bytes a bytes field decodes from JSON
+        data = chunk.data.encode() if isinstance(chunk.data, str) else chunk.data
+        return chunk.chunk_id, chunk.metadata, data, content_hash(data)
+
+    try:
+        headers = ChunkHeaders(
+            chunk_id=request.headers.get("x-chunk-id", ""),
+            metadata=request.headers.get("x-chunk-metadata", "{}")
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+
+    hasher = blake3.blake3()
+    data = await read_body(request, hasher)
+    return headers.chunk_id, headers.metadata, data, hasher.hexdigest()
+
+
 @app.post("/deduplicate", response_model=ChunkResponse)
-async def deduplicate_chunk(request: ChunkRequest, background_tasks: BackgroundTasks):
+async def deduplicate_chunk(request: Request):
     """
     Process a data chunk for deduplication
+
+    Accepts either a JSON ChunkRequest or the raw chunk body; see read_chunk.
     """
+    # Until the body is read, only the raw-stream path knows the chunk id
+    chunk_id = None if is_json_body(request) else request.headers.get("x-chunk-id")
     try:
-        logger.info("Processing chunk", chunk_id=request.chunk_id, size=len(request.data))
+        chunk_id, metadata, data, hash_value = await read_chunk(request)
+        
+        logger.info("Processing chunk", chunk_id=chunk_id, size=len(data))
         
         result = await dedup_engine.process_chunk(
-            chunk_id=request.chunk_id,
-            data=request.data,
-            metadata=request.metadata
+            chunk_id=chunk_id,
+            data=data,
+            metadata=metadata,
+            hash_value=hash_value
         )
         
-        # Schedule background cleanup if needed
+        # Coalesced per hash and applied through the engine by the refcount flush loop
         if result.is_duplicate:
-            background_tasks.add_task(dedup_engine.update_reference_count, result.hash_value, 1)
+            refcount_buffer.add(result.hash_value)
+        chunks_processed.labels(duplicate=str(result.is_duplicate).lower()).inc()
         
         logger.info(
             "Chunk processed",
-            chunk_id=request.chunk_id,
+            chunk_id=chunk_id,
             is_duplicate=result.is_duplicate,
             hash_value=result.hash_value
         )
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error("Failed to process chunk", chunk_id=request.chunk_id, error=str(e))
+        logger.error("Failed to process chunk", chunk_id=chunk_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Deduplication failed: {str(e)}")
 
 
@@ -220,7 +350,8 @@ if __name__ == "__main__":
         "main:app",
         host=settings.host,
         port=settings.port,
+        loop="uvloop",
         log_level=settings.log_level.lower(),
-        access_log=True,
+        access_log=False,  # see chunks_processed for request counts
         reload=settings.debug
     )
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Batched chunk reference counting for the CoreState Deduplication Service.
+
+Duplicate hits are aggregated in process and handed to the deduplication
+engine as one update per chunk hash, instead of one update per request.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable
+
+import structlog
+
+
+logger = structlog.get_logger()
+
+
+class ReferenceCountBuffer:
+    """
+    Accumulates reference-count deltas per chunk hash and applies them with
+    update_reference_count(hash_value, delta) every flush_interval seconds,
+    or sooner once max_pending distinct hashes are waiting. At most
+    max_concurrency updates are in flight at once, so a full flush does not
+    turn into max_pending simultaneous calls against the store.
+
+    update_reference_count is normally DeduplicationEngine.update_reference_count,
+    so the counts stay in the store that delete_chunk and compaction read.
+    """
+
+    def __init__(self, update_reference_count: Callable[[str, int], Awaitable[None]],
+                 flush_interval: float = 0.05, max_pending: int = 1000,
+                 max_concurrency: int = 16):
+        self.update_reference_count = update_reference_count
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._update_slots = asyncio.Semaphore(max_concurrency)
+        self._pending = Counter()
+        self._flush_requested = asyncio.Event()
+
+    def add(self, hash_value: str, delta: int = 1):
+        """
+        Record a reference-count change; it is applied on the next flush
+        """
+        # Only ever touched from the event loop, with no await between the
+        # read and the write, so the counter needs no lock
+        self._pending[hash_value] += delta
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self):
+        """
+        Apply all pending deltas, one engine update per chunk hash, with at
+        most max_concurrency of them in flight
+
+        Deltas whose update failed or never completed, including when the
+        flush itself is cancelled, are put back for the next flush. An update
+        interrupted mid-flight may then be applied twice; over-counting only
+        delays reclaiming a chunk, while a lost reference could let
+        compaction delete a chunk that is still in use.
+        """
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, Counter()
+        updates = {
+            hash_value: asyncio.ensure_future(self._apply(hash_value, delta))
+            for hash_value, delta in pending.items()
+        }
+        try:
+            await asyncio.gather(*updates.values(), return_exceptions=True)
+        finally:
+            errors = []
+            for hash_value, update in updates.items():
+                if not update.done() or update.cancelled():
+                    update.cancel()
+                elif update.exception() is not None:
+                    errors.append(update.exception())
+                else:
+                    continue
+                self._pending[hash_value] += pending[hash_value]
+
+        if errors:
+            raise errors[0]
+
+    async def _apply(self, hash_value: str, delta: int):
+        """Apply one hash's delta once an update slot is free"""
+        async with self._update_slots:
+            await self.update_reference_count(hash_value, delta)
+
+    async def run(self):
+        """
+        Flush loop; run as a background task for the lifetime of the service
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush reference counts", error=str(e))
+
+    async def drain(self, task: asyncio.Task):
+        """
+        Stop the run() task and apply whatever it had not flushed yet
+        """
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test suite for the deduplication service's /deduplicate request handling
+"""
+
+import json
+from types import SimpleNamespace
+
+import blake3
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from main import check_engine_accepts_hash, deduplicate_chunk, read_chunk
+
+
+PAYLOAD = b"chunk payload to deduplicate"
+
+def make_request(body: bytes, headers: dict, piece_size: int = 4) -> Request:
+    """A /deduplicate request whose body arrives in piece_size pieces"""
+    pieces = [body[i:i + piece_size] for i in range(0, len(body), piece_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": piece, "more_body": i < len(pieces) - 1}
+        for i, piece in enumerate(pieces)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/deduplicate",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope, receive)
+
+def json_request(payload) -> Request:
+    """A ChunkRequest-style JSON request"""
+    return make_request(json.dumps(payload).encode(), {"content-type": "application/json"})
+
+def raw_request(body: bytes, **headers) -> Request:
+    """A raw-body request with the given X-Chunk-* headers"""
+    return make_request(body, {"content-type": "application/octet-stream", **headers})
+
+class StubEngine:
+    """Stands in for DeduplicationEngine, recording each process_chunk call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def process_chunk(self, chunk_id, data, metadata, hash_value):
+        self.calls.append({"chunk_id": chunk_id, "data": data, "hash_value": hash_value})
+        return SimpleNamespace(is_duplicate=False, hash_value=hash_value)
+
+class TestReadChunk:
+    """Test both /deduplicate wire formats"""
+
+    @pytest.mark.asyncio
+    async def test_raw_body_with_headers(self):
+        """Test a raw body takes its id and metadata from the X-Chunk-* headers"""
+        request = raw_request(PAYLOAD, **{"x-chunk-id": "c1", "x-chunk-metadata": '{"file": "a.txt"}'})
+        chunk_id, metadata, data, hash_value = await read_chunk(request)
+        assert (chunk_id, metadata, data) == ("c1", {"file": "a.txt"}, PAYLOAD)
+        assert hash_value == blake3.blake3(PAYLOAD).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_json_and_raw_hash_alike(self):
+        """Test the same bytes get the same chunk data and hash on either path"""
+        text = PAYLOAD.decode()
+        json_chunk = await read_chunk(json_request({"chunk_id": "c1", "data": text, "metadata": {}}))
+        raw_chunk = await read_chunk(raw_request(PAYLOAD, **{"x-chunk-id": "c1"}))
+        assert json_chunk == raw_chunk
+
+    @pytest.mark.asyncio
+    async def test_content_type_selects_path(self):
+        """Test a JSON-looking body without the JSON content type is a raw chunk"""
+        body = json.dumps({"chunk_id": "c1", "data": "abc", "metadata": {}}).encode()
+        chunk_id, _, data, hash_value = await read_chunk(raw_request(body, **{"x-chunk-id": "raw"}))
+        assert (chunk_id, data) == ("raw", body)
+        assert hash_value == blake3.blake3(body).hexdigest()
+
+        # And a raw body sent as JSON is rejected rather than hashed
+        with pytest.raises(HTTPException) as excinfo:
+            await read_chunk(make_request(PAYLOAD, {"content-type": "application/json"}))
+        assert excinfo.value.status_code == 422
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("headers", [
+        {},  # No X-Chunk-Id
+        {"x-chunk-id": ""},
+        {"x-chunk-id": "c1", "x-chunk-metadata": "not json"},
+        {"x-chunk-id": "c1", "x-chunk-metadata": "[1, 2]"},
+    ])
+    async def test_bad_headers_rejected(self, headers):
+        """Test a missing chunk id or malformed metadata header is a 422"""
+        with pytest.raises(HTTPException) as excinfo:
+            await read_chunk(raw_request(PAYLOAD, **headers))
+        assert excinfo.value.status_code == 422
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("payload", [
+        {"data": "abc", "metadata": {}},  # No chunk_id
+        {"chunk_id": "c1", "metadata": {}},  # No data
+        [1, 2, 3],
+    ])
+    async def test_bad_json_body_rejected(self, payload):
+        """Test a JSON body that is not a ChunkRequest is a 422"""
+        with pytest.raises(HTTPException) as excinfo:
+            await read_chunk(json_request(payload))
+        assert excinfo.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_oversized_body_rejected(self, monkeypatch):
+        """Test bodies over MAX_CHUNK_BODY_SIZE are refused with 413"""
+        monkeypatch.setattr(main, "MAX_CHUNK_BODY_SIZE", len(PAYLOAD) - 1)
+
+        # Streamed without a Content-Length
+        with pytest.raises(HTTPException) as excinfo:
+            await read_chunk(raw_request(PAYLOAD, **{"x-chunk-id": "c1"}))
+        assert excinfo.value.status_code == 413
+
+        # Declared up front, before any of the body is read
+        request = raw_request(PAYLOAD, **{"x-chunk-id": "c1", "content-length": str(len(PAYLOAD))})
+        with pytest.raises(HTTPException) as excinfo:
+            await read_chunk(request)
+        assert excinfo.value.status_code == 413
+
+        # A body at the limit is accepted
+        monkeypatch.setattr(main, "MAX_CHUNK_BODY_SIZE", len(PAYLOAD))
+        assert (await read_chunk(raw_request(PAYLOAD, **{"x-chunk-id": "c1"})))[2] == PAYLOAD
+
+class TestDeduplicateChunk:
+    """Test the hash the handler hands to the engine"""
+
+    @pytest.mark.asyncio
+    async def test_engine_receives_blake3_digest(self, monkeypatch):
+        """Test process_chunk gets the BLAKE3 digest of the payload on both paths"""
+        engine = StubEngine()
+        monkeypatch.setattr(main, "dedup_engine", engine)
+
+        await deduplicate_chunk(raw_request(PAYLOAD, **{"x-chunk-id": "raw"}))
+        await deduplicate_chunk(json_request({"chunk_id": "json", "data": PAYLOAD.decode(), "metadata": {}}))
+
+        digest = blake3.blake3(PAYLOAD).hexdigest()
+        assert engine.calls == [
+            {"chunk_id": "raw", "data": PAYLOAD, "hash_value": digest},
+            {"chunk_id": "json", "data": PAYLOAD, "hash_value": digest},
+        ]
+
+    def test_engine_without_hash_value_fails_fast(self):
+        """Test an engine whose process_chunk lacks hash_value is refused at startup"""
+        check_engine_accepts_hash(StubEngine())
+
+        class LegacyEngine:
+            async def process_chunk(self, chunk_id, data, metadata):
+                pass
+
+        with pytest.raises(RuntimeError):
+            check_engine_accepts_hash(LegacyEngine())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test suite for the deduplication service's batched reference counting
+"""
+
+import asyncio
+
+import pytest
+
+from refcounts import ReferenceCountBuffer
+
+
+class RecordingEngine:
+    """Stands in for DeduplicationEngine.update_reference_count"""
+
+    def __init__(self, fail_for=(), block_first_call=False):
+        self.applied = {}
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_for = set(fail_for)
+        self.block_first_call = block_first_call
+
+    async def update_reference_count(self, hash_value, delta):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.block_first_call and self.calls == 1:
+                await asyncio.Event().wait()  # never set; only cancellation ends it
+            await asyncio.sleep(0)
+            if hash_value in self.fail_for:
+                raise ConnectionError("store unavailable")
+            self.applied[hash_value] = self.applied.get(hash_value, 0) + delta
+        finally:
+            self.in_flight -= 1
+
+class TestReferenceCountBuffer:
+    """Test accumulating and flushing reference-count deltas"""
+
+    @pytest.mark.asyncio
+    async def test_add_accumulates_per_hash(self):
+        """Test repeated hits on one hash collapse into a single delta"""
+        buffer = ReferenceCountBuffer(RecordingEngine().update_reference_count, max_pending=2)
+        buffer.add("a")
+        buffer.add("a")
+        buffer.add("a", 3)
+        assert buffer._pending == {"a": 5}
+        assert not buffer._flush_requested.is_set()
+
+        # Reaching max_pending distinct hashes asks the loop to flush early
+        buffer.add("b")
+        assert buffer._flush_requested.is_set()
+
+    @pytest.mark.asyncio
+    async def test_flush_applies_deltas_through_engine(self):
+        """Test a flush makes one engine update per hash with the summed delta"""
+        engine = RecordingEngine()
+        buffer = ReferenceCountBuffer(engine.update_reference_count)
+        for hash_value in ["a", "b", "a", "a"]:
+            buffer.add(hash_value)
+
+        await buffer.flush()
+        assert engine.applied == {"a": 3, "b": 1}
+        assert engine.calls == 2
+        assert not buffer._pending
+
+        # Nothing pending means no engine calls
+        await buffer.flush()
+        assert engine.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_bounds_concurrent_updates(self):
+        """Test a large flush never has more than max_concurrency updates in flight"""
+        engine = RecordingEngine()
+        buffer = ReferenceCountBuffer(engine.update_reference_count, max_concurrency=4)
+        for i in range(100):
+            buffer.add(f"hash-{i}")
+
+        await buffer.flush()
+        assert len(engine.applied) == 100
+        assert engine.max_in_flight == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_updates_are_retried(self):
+        """Test only the deltas whose update failed stay pending"""
+        engine = RecordingEngine(fail_for={"b"})
+        buffer = ReferenceCountBuffer(engine.update_reference_count)
+        buffer.add("a")
+        buffer.add("b", 2)
+
+        with pytest.raises(ConnectionError):
+            await buffer.flush()
+        assert engine.applied == {"a": 1}
+        assert buffer._pending == {"b": 2}
+
+        engine.fail_for.clear()
+        await buffer.flush()
+        assert engine.applied == {"a": 1, "b": 2}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_flush_keeps_deltas(self):
+        """Test cancelling a flush partway puts its un-applied deltas back"""
+        engine = RecordingEngine(block_first_call=True)
+        buffer = ReferenceCountBuffer(engine.update_reference_count)
+        buffer.add("a", 2)
+        buffer.add("b")
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+        # "b" completed before the cancel; "a" was still in flight
+        assert engine.applied == {"b": 1}
+        assert buffer._pending == {"a": 2}
+
+    @pytest.mark.asyncio
+    async def test_drain_flushes_pending_on_shutdown(self):
+        """Test drain stops the loop and applies deltas it had not flushed"""
+        engine = RecordingEngine()
+        buffer = ReferenceCountBuffer(engine.update_reference_count, flush_interval=60)
+        task = asyncio.create_task(buffer.run())
+        buffer.add("a")
+        buffer.add("a")
+
+        await buffer.drain(task)
+        assert task.done()
+        assert engine.applied == {"a": 2}
+
+    @pytest.mark.asyncio
+    async def test_drain_recovers_flush_cancelled_mid_flight(self):
+        """Test deltas of a loop flush interrupted by shutdown reach the engine"""
+        engine = RecordingEngine(block_first_call=True)
+        buffer = ReferenceCountBuffer(engine.update_reference_count, flush_interval=0.001)
+        task = asyncio.create_task(buffer.run())
+        buffer.add("a", 4)
+
+        # Let the loop start a flush that is stuck in its engine update
+        while engine.calls == 0:
+            await asyncio.sleep(0.001)
+        await buffer.drain(task)
+        assert engine.applied == {"a": 4}
+        assert not buffer._pending
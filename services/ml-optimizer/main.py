@@ -10,23 +10,27 @@ import asyncio
 import logging
 import os
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-import json
 
 import numpy as np
-import pandas as pd
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import uvicorn
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-import joblib
+import orjson
+from numba import njit, prange
 import redis.asyncio as redis
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response
 import structlog
 
 # Configure structured logging
@@ -58,17 +62,62 @@ active_models = Gauge('ml_active_models', 'Number of active ML models')
 
 # Configuration
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '32'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '5'))  # seconds to wait for a free connection
 MODEL_UPDATE_INTERVAL = int(os.getenv('MODEL_UPDATE_INTERVAL', '3600'))  # 1 hour
+TRAINING_STREAM = os.getenv('TRAINING_STREAM', 'training:stream')
+MODEL_PATH = os.getenv('MODEL_PATH', 'models')
+BACKUP_MODEL_FILE = os.path.join(MODEL_PATH, 'backup_predictor.npz')
+ANOMALY_MODEL_FILE = os.path.join(MODEL_PATH, 'anomaly_detector.npz')
 ANOMALY_THRESHOLD = float(os.getenv('ANOMALY_THRESHOLD', '0.1'))
+ANOMALY_N_ESTIMATORS = int(os.getenv('ANOMALY_N_ESTIMATORS', '100'))
+TRAINING_N_JOBS = int(os.getenv('TRAINING_N_JOBS', '-1'))
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '64'))
+BATCH_MAX_WAIT = float(os.getenv('BATCH_MAX_WAIT_MS', '5')) / 1000.0
+THREADPOOL_SIZE = int(os.getenv('THREADPOOL_SIZE', '64'))
+METRICS_SNAPSHOT_TTL = float(os.getenv('METRICS_SNAPSHOT_TTL', '1'))
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '4096'))
+
+# Model feature columns, in training-matrix order
+BACKUP_FEATURES = ['file_count', 'total_size', 'device_cpu', 'device_memory', 'network_speed']
+BACKUP_TARGET = 'backup_duration'
+ANOMALY_FEATURES = ['cpu_usage', 'memory_usage', 'disk_io', 'network_io', 'backup_speed']
 
 # Global state
 redis_client: Optional[redis.Redis] = None
 ml_models: Dict[str, Any] = {}
+# Set when the last load_or_train_models run failed; /health reports it
+# while that failure leaves a model untrained
+model_training_failed = False
+_cached_timestamp = (float('-inf'), '')
+_cached_metrics = (float('-inf'), b'')
+
+def cached_utc_timestamp() -> str:
+    """Current UTC time in ISO format, re-rendered at most once per second"""
+    global _cached_timestamp
+    now = time.monotonic()
+    if now - _cached_timestamp[0] >= 1.0:
+        _cached_timestamp = (now, datetime.utcnow().isoformat())
+    return _cached_timestamp[1]
+
+def cached_metrics() -> bytes:
+    """Prometheus exposition text, regenerated at most every METRICS_SNAPSHOT_TTL seconds"""
+    global _cached_metrics
+    now = time.monotonic()
+    if now - _cached_metrics[0] >= METRICS_SNAPSHOT_TTL:
+        _cached_metrics = (now, generate_latest())
+    return _cached_metrics[1]
 
 # Pydantic models
+# Request bodies are validated per request rather than memoized: validating
+# one takes 3-4 us, and a cached instance, with its mutable lists and dicts,
+# would be shared between requests.
 class BackupRequest(BaseModel):
     device_id: str
-    file_paths: List[str]
+    # Only the number of files is used; clients should send file_count rather
+    # than validating and shipping every path. file_paths is deprecated.
+    file_count: Optional[int] = Field(default=None, ge=0)
+    file_paths: List[str] = Field(default_factory=list)
     priority: int = Field(default=1, ge=1, le=5)
     estimated_size: int = Field(gt=0)
     metadata: Dict[str, Any] = Field(default_factory=dict)
@@ -104,152 +153,510 @@ class OptimizationResult(BaseModel):
     expected_improvement: Dict[str, float]
     resource_utilization: Dict[str, float]
 
+# Compiled tree ensembles
+@njit(cache=True)
+def _forest_mean(x, feature, threshold, left, right, value):
+    """Average the leaf value reached by one float32 feature row across all trees"""
+    total = 0.0
+    for t in range(feature.shape[0]):
+        node = 0
+        while left[t, node] != -1:
+            if x[feature[t, node]] <= threshold[t, node]:
+                node = left[t, node]
+            else:
+                node = right[t, node]
+        total += value[t, node]
+    return total / feature.shape[0]
+
+@njit(cache=True)
+def _forest_mean_batch(X, feature, threshold, left, right, value):
+    """_forest_mean over every row of a float32 feature matrix"""
+    out = np.empty(X.shape[0], dtype=np.float64)
+    for i in range(X.shape[0]):
+        out[i] = _forest_mean(X[i], feature, threshold, left, right, value)
+    return out
+
+def _flatten_trees(trees, node_values) -> tuple:
+    """Stack fitted sklearn trees into padded (n_trees, max_nodes) arrays for _forest_mean"""
+    n_trees = len(trees)
+    max_nodes = max(tree.node_count for tree in trees)
+    # 32-bit node indices keep the arrays walked per row small; thresholds stay
+    # float64, as sklearn compares the float32 features against them
+    feature = np.zeros((n_trees, max_nodes), dtype=np.int32)
+    threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    left = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+    right = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+    value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+    
+    for t, (tree, values) in enumerate(zip(trees, node_values)):
+        n = tree.node_count
+        feature[t, :n] = np.maximum(tree.feature, 0)  # leaves store -2
+        threshold[t, :n] = tree.threshold
+        left[t, :n] = tree.children_left
+        right[t, :n] = tree.children_right
+        value[t, :n] = values
+    
+    return feature, threshold, left, right, value
+
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value')
+FOREST_DTYPES = (np.int32, np.float64, np.int32, np.int32, np.float64)
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """c(n), the average unsuccessful-search path length in a BST of n samples
+    
+    IsolationForest's normalizer and its correction for leaves holding more
+    than one sample.
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    lengths[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return lengths
+
+def _node_depths(tree) -> np.ndarray:
+    """Edges from the root to every node of a fitted sklearn tree"""
+    depths = np.zeros(tree.node_count, dtype=np.float64)
+    left, right = tree.children_left, tree.children_right
+    frontier, depth = np.array([0]), 0
+    while frontier.size:
+        depths[frontier] = depth
+        frontier = frontier[left[frontier] != -1]
+        frontier = np.concatenate((left[frontier], right[frontier]))
+        depth += 1
+    return depths
+
+def _save_arrays(path: str, **arrays):
+    """Write arrays to an .npz archive, replacing any existing file atomically"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def _standardize(X: np.ndarray, mean: np.ndarray, inv_scale: np.ndarray) -> np.ndarray:
+    """StandardScaler.transform without its validation, as the float32 matrix the trees read"""
+    # Scale in float64 like sklearn, then round once, as its tree predict would
+    X_scaled = np.subtract(X, mean, dtype=np.float64)
+    X_scaled *= inv_scale
+    return X_scaled.astype(np.float32)
+
 # ML Model Management
 class BackupPredictor:
     def __init__(self):
         self.model = None
         self.scaler = StandardScaler()
         self.is_trained = False
+        self._inference = None  # (mean, inv_scale, forest)
+        # Bumped whenever _inference changes, so cached predictions of an
+        # older model are never returned
+        self._model_version = 0
+        # LRU of (feature row, model version) -> prediction. predict_batch runs
+        # on executor threads, so lookups and inserts hold the lock
+        self._prediction_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         
-    def train(self, training_data: pd.DataFrame):
-        """Train the backup prediction model"""
+    def train(self, X: np.ndarray, y: Optional[np.ndarray] = None):
+        """Train the backup prediction model on BACKUP_FEATURES columns and durations"""
         try:
-            if training_data.empty:
+            if y is None or len(X) == 0:
                 logger.warning("No training data provided")
                 return
                 
-            features = ['file_count', 'total_size', 'device_cpu', 'device_memory', 'network_speed']
-            X = training_data[features]
-            y = training_data['backup_duration']
-            
-            X_scaled = self.scaler.fit_transform(X)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
             
             # Simple linear model for demonstration
             from sklearn.ensemble import RandomForestRegressor
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_scaled, y)
+            # Trees are built on TRAINING_N_JOBS threads; with a fixed random_state
+            # the fitted forest is the same for any thread count
+            model = RandomForestRegressor(n_estimators=100, n_jobs=TRAINING_N_JOBS, random_state=42)
+            model.fit(X_scaled, y)
             
+        except Exception as e:
+            logger.error("Failed to train backup prediction model", error=str(e))
+            return
+            
+        # A fitted forest that cannot be compiled would leave prediction on
+        # default estimates, so this propagates instead of being logged
+        compiled = self._compile_forest(model)
+        # Retraining can run on a worker thread while requests are scored,
+        # so the state predict_batch reads is swapped in with one assignment
+        self.scaler, self.model = scaler, model
+        self._inference = (scaler.mean_.copy(), 1.0 / scaler.scale_, compiled)
+        self._model_version += 1
+        self.is_trained = True
+        logger.info("Backup prediction model trained successfully")
+            
+    @staticmethod
+    def _compile_forest(model) -> tuple:
+        """Export a fitted forest for _forest_mean"""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return _flatten_trees(trees, [tree.value[:, 0, 0] for tree in trees])
+        
+    def save(self, path: str):
+        """Save the compiled forest and scaler statistics as an .npz archive"""
+        try:
+            mean, inv_scale, forest = self._inference
+            _save_arrays(path, mean=mean, inv_scale=inv_scale, **dict(zip(FOREST_ARRAYS, forest)))
+            logger.info("Backup prediction model saved", path=path)
+            
+        except Exception as e:
+            logger.error("Failed to save backup prediction model", path=path, error=str(e))
+            
+    def load(self, path: str):
+        """Load a model written by save(); scoring it needs no sklearn objects"""
+        try:
+            with np.load(path) as archive:
+                # Archives from before the int32 indices are narrowed rather than
+                # compiled into a second kernel specialization
+                forest = tuple(archive[name].astype(dtype, copy=False)
+                               for name, dtype in zip(FOREST_ARRAYS, FOREST_DTYPES))
+                mean, inv_scale = archive['mean'], archive['inv_scale']
+            # Fail here rather than on the first request if the archive does not fit the kernel
+            _forest_mean_batch(np.zeros((1, mean.shape[0]), dtype=np.float32), *forest)
+            
+            self._inference = (mean, inv_scale, forest)
+            self._model_version += 1
             self.is_trained = True
-            logger.info("Backup prediction model trained successfully")
+            logger.info("Backup prediction model loaded", path=path)
             
         except Exception as e:
-            logger.error("Failed to train backup prediction model", error=str(e))
+            logger.error("Failed to load backup prediction model", path=path, error=str(e))
+        
+    @staticmethod
+    def _feature_row(features: Dict[str, float]) -> tuple:
+        return (
+            features.get('file_count', 100),
+            features.get('total_size', 1000000),
+            features.get('device_cpu', 50.0),
+            features.get('device_memory', 70.0),
+            features.get('network_speed', 100.0)
+        )
+        
+    def _cache_get(self, key: tuple) -> Optional[Dict[str, float]]:
+        with self._cache_lock:
+            result = self._prediction_cache.get(key)
+            if result is not None:
+                self._prediction_cache.move_to_end(key)
+            return result
             
+    def _cache_put(self, key: tuple, result: Dict[str, float]):
+        with self._cache_lock:
+            self._prediction_cache[key] = result
+            self._prediction_cache.move_to_end(key)
+            while len(self._prediction_cache) > PREDICTION_CACHE_SIZE:
+                self._prediction_cache.popitem(last=False)
+        
     def predict(self, features: Dict[str, float]) -> Dict[str, float]:
-        """Predict backup metrics"""
-        if not self.is_trained or self.model is None:
+        """Predict backup metrics for a single request"""
+        return self.predict_batch([features])[0]
+        
+    def predict_array(self, X: np.ndarray) -> np.ndarray:
+        """Predict raw durations for an (n, 5) matrix of BACKUP_FEATURES columns"""
+        mean, inv_scale, forest = self._inference
+        return _forest_mean_batch(_standardize(X, mean, inv_scale), *forest)
+    
+    @staticmethod
+    def _results(durations: np.ndarray) -> List[Dict[str, float]]:
+        results = []
+        for duration in durations.tolist():
+            # Calculate success rate based on historical data patterns
+            success_rate = max(0.7, min(0.99, 1.0 - (duration / 3600.0) * 0.1))
+            results.append({
+                'predicted_duration': max(30.0, duration),
+                'predicted_success_rate': success_rate,
+                'confidence': 0.8
+            })
+        return results
+        
+    def predict_batch(self, features_batch: List[Dict[str, float]]) -> List[Dict[str, float]]:
+        """Predict backup metrics for several requests with one forest pass"""
+        if not self.is_trained or self._inference is None:
             logger.warning("Model not trained, using default predictions")
-            return {
+            return [{
                 'predicted_duration': 300.0,  # 5 minutes default
                 'predicted_success_rate': 0.95,
                 'confidence': 0.5
-            }
+            } for _ in features_batch]
             
         try:
-            feature_vector = np.array([[
-                features.get('file_count', 100),
-                features.get('total_size', 1000000),
-                features.get('device_cpu', 50.0),
-                features.get('device_memory', 70.0),
-                features.get('network_speed', 100.0)
-            ]])
+            # Read before predict_array: train() and load() publish _inference
+            # before bumping the version, so a result is never cached under a
+            # newer version than the model that produced it
+            model_version = self._model_version
+            results = [None] * len(features_batch)
+            misses = []
+            for i, features in enumerate(features_batch):
+                key = (self._feature_row(features), model_version)
+                cached = self._cache_get(key)
+                if cached is None:
+                    misses.append((i, key))
+                else:
+                    results[i] = dict(cached)
             
-            feature_vector_scaled = self.scaler.transform(feature_vector)
-            duration = self.model.predict(feature_vector_scaled)[0]
+            if misses:
+                # Only the rows not seen under this model go through the forest.
+                # Filling a preallocated matrix beats np.array's nested-list inference
+                feature_matrix = np.empty((len(misses), 5), dtype=np.float64)
+                for j, (_, (row, _)) in enumerate(misses):
+                    feature_matrix[j] = row
+                for (i, key), result in zip(misses, self._results(self.predict_array(feature_matrix))):
+                    self._cache_put(key, result)
+                    results[i] = dict(result)
             
-            # Calculate success rate based on historical data patterns
-            success_rate = max(0.7, min(0.99, 1.0 - (duration / 3600.0) * 0.1))
-            
-            return {
-                'predicted_duration': max(30.0, duration),
-                'predicted_success_rate': success_rate,
-                'confidence': 0.8
-            }
+            return results
             
         except Exception as e:
             logger.error("Prediction failed", error=str(e))
-            return {
+            return [{
                 'predicted_duration': 300.0,
                 'predicted_success_rate': 0.95,
                 'confidence': 0.3
-            }
+            } for _ in features_batch]
 
 class AnomalyDetector:
     def __init__(self):
-        self.model = IsolationForest(contamination=ANOMALY_THRESHOLD, random_state=42)
+        # Each tree sees at most 256 samples (max_samples='auto'), so the tree
+        # count, not the dataset size, sets the training cost
+        self.model = IsolationForest(
+            n_estimators=ANOMALY_N_ESTIMATORS,
+            contamination=ANOMALY_THRESHOLD,
+            n_jobs=TRAINING_N_JOBS,
+            random_state=42
+        )
         self.scaler = StandardScaler()
         self.is_trained = False
+        self._inference = None  # (mean, inv_scale, forest, path_length_normalizer, offset)
         
-    def train(self, training_data: pd.DataFrame):
-        """Train the anomaly detection model"""
+    def train(self, X: np.ndarray, y: Optional[np.ndarray] = None):
+        """Train the anomaly detection model on ANOMALY_FEATURES columns"""
         try:
-            if training_data.empty:
+            if len(X) == 0:
                 logger.warning("No training data for anomaly detection")
                 return
                 
-            features = ['cpu_usage', 'memory_usage', 'disk_io', 'network_io', 'backup_speed']
-            X = training_data[features].fillna(0)
-            
-            X_scaled = self.scaler.fit_transform(X)
-            self.model.fit(X_scaled)
+            X = np.where(np.isnan(X), 0, X)
             
-            self.is_trained = True
-            logger.info("Anomaly detection model trained successfully")
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+            model = clone(self.model)
+            model.fit(X_scaled)
             
         except Exception as e:
             logger.error("Failed to train anomaly detection model", error=str(e))
+            return
+            
+        # A fitted forest that cannot be compiled would leave detection on
+        # default scores, so this propagates instead of being logged
+        compiled = self._compile_forest(model)
+        self.scaler, self.model = scaler, model
+        self._inference = (scaler.mean_.copy(), 1.0 / scaler.scale_) + compiled
+        self.is_trained = True
+        logger.info("Anomaly detection model trained successfully")
+            
+    @staticmethod
+    def _compile_forest(model) -> tuple:
+        """Export fitted isolation trees for _forest_mean
+        
+        Each node's value is the path length an observation ending there is
+        charged, its depth plus c(n) for the n training samples it holds, so
+        the mean over trees is the expected depth used by
+        IsolationForest.score_samples. Only public tree_ arrays are read.
+        Returns (forest, path_length_normalizer, offset).
+        """
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        path_lengths = [_node_depths(tree) + _average_path_length(tree.n_node_samples) for tree in trees]
+        forest = _flatten_trees(trees, path_lengths)
+        path_length_normalizer = float(_average_path_length([model.max_samples_])[0])
+        return forest, path_length_normalizer, model.offset_
+        
+    def save(self, path: str):
+        """Save the compiled isolation trees and score calibration as an .npz archive"""
+        try:
+            mean, inv_scale, forest, path_length_normalizer, offset = self._inference
+            _save_arrays(
+                path, mean=mean, inv_scale=inv_scale,
+                path_length_normalizer=path_length_normalizer, offset=offset,
+                **dict(zip(FOREST_ARRAYS, forest))
+            )
+            logger.info("Anomaly detection model saved", path=path)
+            
+        except Exception as e:
+            logger.error("Failed to save anomaly detection model", path=path, error=str(e))
+            
+    def load(self, path: str):
+        """Load a model written by save(); scoring it needs no sklearn objects"""
+        try:
+            with np.load(path) as archive:
+                forest = tuple(archive[name].astype(dtype, copy=False)
+                               for name, dtype in zip(FOREST_ARRAYS, FOREST_DTYPES))
+                mean, inv_scale = archive['mean'], archive['inv_scale']
+                path_length_normalizer = float(archive['path_length_normalizer'])
+                offset = float(archive['offset'])
+            # Fail here rather than on the first request if the archive does not fit the kernel
+            _forest_mean_batch(np.zeros((1, mean.shape[0]), dtype=np.float32), *forest)
             
+            self._inference = (mean, inv_scale, forest, path_length_normalizer, offset)
+            self.is_trained = True
+            logger.info("Anomaly detection model loaded", path=path)
+            
+        except Exception as e:
+            logger.error("Failed to load anomaly detection model", path=path, error=str(e))
+        
+    @staticmethod
+    def _decision_function(X: np.ndarray, forest: tuple, path_length_normalizer: float, offset: float) -> np.ndarray:
+        """Same values as IsolationForest.decision_function for float32 rows"""
+        depths = _forest_mean_batch(X, *forest)
+        if path_length_normalizer == 0:
+            # A single training sample: sklearn takes depth / normalizer as 1
+            scores = np.full_like(depths, 0.5)
+        else:
+            scores = 2.0 ** (-depths / path_length_normalizer)
+        return -scores - offset
+        
     def detect(self, metrics: Dict[str, float]) -> Dict[str, Any]:
         """Detect anomalies in backup metrics"""
-        if not self.is_trained:
+        return self.detect_batch([metrics])[0]
+        
+    def _score_scaled(self, X: np.ndarray):
+        mean, inv_scale, *scoring = self._inference
+        X_scaled = _standardize(X, mean, inv_scale)
+        return self._decision_function(X_scaled, *scoring), X_scaled
+    
+    def score_array(self, X: np.ndarray) -> np.ndarray:
+        """Anomaly scores for an (n, 5) matrix of ANOMALY_FEATURES columns; negative is anomalous"""
+        return self._score_scaled(X)[0]
+    
+    def detect_batch(self, metrics_batch: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+        """Detect anomalies for several metric samples with one forest pass"""
+        if not self.is_trained or self._inference is None:
             logger.warning("Anomaly model not trained, skipping detection")
-            return {
+            return [{
                 'is_anomaly': False,
                 'anomaly_score': 0.0,
                 'affected_metrics': [],
                 'confidence': 0.0
-            }
+            } for _ in metrics_batch]
             
         try:
-            feature_vector = np.array([[
-                metrics.get('cpu_usage', 50.0),
-                metrics.get('memory_usage', 60.0),
-                metrics.get('disk_io', 100.0),
-                metrics.get('network_io', 50.0),
-                metrics.get('backup_speed', 10.0)
-            ]])
-            
-            feature_vector_scaled = self.scaler.transform(feature_vector)
-            anomaly_score = self.model.decision_function(feature_vector_scaled)[0]
-            is_anomaly = self.model.predict(feature_vector_scaled)[0] == -1
-            
-            # Identify which metrics contribute most to anomaly
-            affected_metrics = []
-            if is_anomaly:
-                metric_names = ['cpu_usage', 'memory_usage', 'disk_io', 'network_io', 'backup_speed']
-                feature_importance = np.abs(feature_vector_scaled[0])
-                top_indices = np.argsort(feature_importance)[-2:]
-                affected_metrics = [metric_names[i] for i in top_indices]
-            
-            return {
-                'is_anomaly': bool(is_anomaly),
-                'anomaly_score': float(anomaly_score),
-                'affected_metrics': affected_metrics,
-                'confidence': 0.8 if self.is_trained else 0.3
-            }
+            feature_matrix = np.empty((len(metrics_batch), 5), dtype=np.float64)
+            for i, metrics in enumerate(metrics_batch):
+                feature_matrix[i] = (
+                    metrics.get('cpu_usage', 50.0),
+                    metrics.get('memory_usage', 60.0),
+                    metrics.get('disk_io', 100.0),
+                    metrics.get('network_io', 50.0),
+                    metrics.get('backup_speed', 10.0)
+                )
+            
+            anomaly_scores, feature_matrix_scaled = self._score_scaled(feature_matrix)
+            
+            results = []
+            for anomaly_score, scaled_row in zip(anomaly_scores.tolist(), feature_matrix_scaled):
+                is_anomaly = anomaly_score < 0  # IsolationForest.predict's -1 rule
+                
+                # Identify which metrics contribute most to anomaly
+                affected_metrics = []
+                if is_anomaly:
+                    feature_importance = np.abs(scaled_row)
+                    top_indices = np.argsort(feature_importance)[-2:]
+                    affected_metrics = [ANOMALY_FEATURES[i] for i in top_indices]
+                
+                results.append({
+                    'is_anomaly': bool(is_anomaly),
+                    'anomaly_score': float(anomaly_score),
+                    'affected_metrics': affected_metrics,
+                    'confidence': 0.8 if self.is_trained else 0.3
+                })
+            return results
             
         except Exception as e:
             logger.error("Anomaly detection failed", error=str(e))
-            return {
+            return [{
                 'is_anomaly': False,
                 'anomaly_score': 0.0,
                 'affected_metrics': [],
                 'confidence': 0.0
-            }
+            } for _ in metrics_batch]
+
+class MicroBatcher:
+    """Coalesce concurrent single-item model calls into one batch call
+    
+    Requests queue an item and await a future; a worker task gathers up to
+    max_batch_size items or waits at most max_wait seconds, whichever comes
+    first, and resolves every future from a single batch_fn call. batch_fn
+    runs in the loop's default executor so inference never blocks the loop.
+    """
+    
+    def __init__(self, batch_fn, max_batch_size: int = BATCH_MAX_SIZE, max_wait: float = BATCH_MAX_WAIT):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        
+    def start(self):
+        """Spawn the worker task on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        
+    async def stop(self):
+        """Cancel the worker task"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None:
+            # No worker outside the app lifespan; run the item on its own
+            return (await loop.run_in_executor(None, self.batch_fn, [item]))[0]
+            
+        future = loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+        
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                    
+            try:
+                results = await loop.run_in_executor(None, self.batch_fn, [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+                
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
 
 # Initialize ML models
 backup_predictor = BackupPredictor()
 anomaly_detector = AnomalyDetector()
+backup_batcher = MicroBatcher(backup_predictor.predict_batch)
+anomaly_batcher = MicroBatcher(anomaly_detector.detect_batch)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -258,20 +665,40 @@ async def lifespan(app: FastAPI):
     
     # Startup
     logger.info("Starting ML Optimizer service")
+    # Batched inference and retraining run through run_in_executor(None, ...),
+    # so the loop's default executor is the pool THREADPOOL_SIZE sizes
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREADPOOL_SIZE, thread_name_prefix='ml-optimizer')
+    )
     
     try:
-        redis_client = redis.from_url(REDIS_URL)
+        # A blocking pool makes a burst wait for a free connection instead of
+        # failing with "Too many connections" once the pool is exhausted
+        redis_client = redis.Redis.from_pool(redis.BlockingConnectionPool.from_url(
+            REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT, decode_responses=False
+        ))
         await redis_client.ping()
         logger.info("Connected to Redis")
     except Exception as e:
         logger.error("Failed to connect to Redis", error=str(e))
         redis_client = None
     
+    # Seed the stream position before the startup training, so data
+    # announced while it runs still triggers an update
+    training_stream_id = None
+    if redis_client:
+        try:
+            training_stream_id = await latest_training_stream_id()
+        except Exception as e:
+            logger.error("Failed to read training stream position", error=str(e))
+    
     # Load or train models
     await load_or_train_models()
     
     # Start background tasks
-    asyncio.create_task(periodic_model_update())
+    asyncio.create_task(periodic_model_update(training_stream_id))
+    backup_batcher.start()
+    anomaly_batcher.start()
     
     active_models.set(len(ml_models))
     
@@ -279,6 +706,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down ML Optimizer service")
+    await backup_batcher.stop()
+    await anomaly_batcher.stop()
     if redis_client:
         await redis_client.close()
 
@@ -286,7 +715,8 @@ app = FastAPI(
     title="CoreState ML Optimizer",
     description="Machine Learning service for backup optimization and anomaly detection",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -297,117 +727,216 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def decode_training_columns(payload: bytes, columns: List[str]) -> np.ndarray:
+    """Decode JSON training data into a float32 matrix with the given columns
+    
+    Accepts the pandas to_json layouts: a list of record objects, an
+    object of column lists, or an object of {index: value} column objects.
+    Missing values become NaN. The matrix is column-major, so each column
+    is filled contiguously and never transposed into a second copy; the
+    scaler and the tree builders accept it as is.
+    """
+    data = orjson.loads(payload)
+    if not data:
+        return np.empty((0, len(columns)), dtype=np.float32)
+        
+    if isinstance(data, list):
+        X = np.empty((len(data), len(columns)), dtype=np.float32, order='F')
+        for j, column in enumerate(columns):
+            X[:, j] = np.asarray([record.get(column) for record in data], dtype=np.float32)
+        return X
+        
+    values = [data[column] for column in columns]
+    values = [list(value.values()) if isinstance(value, dict) else value for value in values]
+    return np.asarray(values, dtype=np.float32).T
+
+def train_backup_predictor(backup_data: Optional[bytes]):
+    """Train the backup predictor on stored data, else load the saved model,
+    else fall back to synthetic data"""
+    trained = False
+    if backup_data:
+        data = decode_training_columns(backup_data, BACKUP_FEATURES + [BACKUP_TARGET])
+        backup_predictor.train(data[:, :-1], data[:, -1])
+        trained = True
+        
+    if not backup_predictor.is_trained and os.path.exists(BACKUP_MODEL_FILE):
+        backup_predictor.load(BACKUP_MODEL_FILE)
+        
+    # Generate synthetic training data if no historical data
+    if not backup_predictor.is_trained:
+        X, y = generate_synthetic_backup_data()
+        backup_predictor.train(X, y)
+        trained = True
+        
+    if trained and backup_predictor.is_trained:
+        backup_predictor.save(BACKUP_MODEL_FILE)
+
+def train_anomaly_detector(anomaly_data: Optional[bytes]):
+    """Train the anomaly detector on stored data, else load the saved model,
+    else fall back to synthetic data"""
+    trained = False
+    if anomaly_data:
+        anomaly_detector.train(decode_training_columns(anomaly_data, ANOMALY_FEATURES))
+        trained = True
+        
+    if not anomaly_detector.is_trained and os.path.exists(ANOMALY_MODEL_FILE):
+        anomaly_detector.load(ANOMALY_MODEL_FILE)
+        
+    if not anomaly_detector.is_trained:
+        anomaly_detector.train(generate_synthetic_anomaly_data())
+        trained = True
+        
+    if trained and anomaly_detector.is_trained:
+        anomaly_detector.save(ANOMALY_MODEL_FILE)
+
 async def load_or_train_models():
     """Load existing models or train new ones"""
+    global model_training_failed
     try:
-        # Try to load historical data for training
+        # Try to load historical data for training, in one round-trip
+        backup_data = anomaly_data = None
         if redis_client:
-            backup_data = await redis_client.get("training:backup_data")
-            anomaly_data = await redis_client.get("training:anomaly_data")
-            
-            if backup_data:
-                df = pd.read_json(backup_data)
-                backup_predictor.train(df)
-                
-            if anomaly_data:
-                df = pd.read_json(anomaly_data)
-                anomaly_detector.train(df)
+            backup_data, anomaly_data = await redis_client.mget("training:backup_data", "training:anomaly_data")
         
-        # Generate synthetic training data if no historical data
-        if not backup_predictor.is_trained:
-            synthetic_backup_data = generate_synthetic_backup_data()
-            backup_predictor.train(synthetic_backup_data)
-            
-        if not anomaly_detector.is_trained:
-            synthetic_anomaly_data = generate_synthetic_anomaly_data()
-            anomaly_detector.train(synthetic_anomaly_data)
+        # Training is CPU-bound; run both models side by side off the event loop
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(None, train_backup_predictor, backup_data),
+            loop.run_in_executor(None, train_anomaly_detector, anomaly_data)
+        )
             
         ml_models['backup_predictor'] = backup_predictor
         ml_models['anomaly_detector'] = anomaly_detector
         
+        model_training_failed = False
         logger.info("ML models loaded/trained successfully")
         
     except Exception as e:
+        model_training_failed = True
         logger.error("Failed to load/train models", error=str(e))
 
-def generate_synthetic_backup_data() -> pd.DataFrame:
-    """Generate synthetic training data for backup prediction"""
-    np.random.seed(42)
+@njit(parallel=True, fastmath=True, cache=True)
+def _backup_duration(file_count, total_size, noise, out):
+    """Synthetic backup duration in seconds, fused into one parallel pass"""
+    for i in prange(out.shape[0]):
+        out[i] = max(30.0, file_count[i] * 0.1 + total_size[i] / 1000000 * 60 + noise[i])
+
+def generate_synthetic_backup_data() -> tuple:
+    """Generate synthetic (X, y) training data for backup prediction
+    
+    X holds BACKUP_FEATURES columns and y the backup durations, both float32.
+    """
+    rng = np.random.default_rng(42)
     n_samples = 1000
     
-    data = {
-        'file_count': np.random.randint(10, 10000, n_samples),
-        'total_size': np.random.randint(1000, 100000000, n_samples),
-        'device_cpu': np.random.uniform(20, 90, n_samples),
-        'device_memory': np.random.uniform(30, 95, n_samples),
-        'network_speed': np.random.uniform(1, 1000, n_samples),
-    }
+    # One contiguous row per feature so the generator can fill it in place;
+    # X is returned as the (n_samples, n_features) transposed view
+    columns = np.empty((len(BACKUP_FEATURES), n_samples), dtype=np.float32)
+    file_count, total_size = columns[0], columns[1]
+    
+    file_count[:] = rng.integers(10, 10000, n_samples)
+    total_size[:] = rng.integers(1000, 100000000, n_samples)
+    
+    # device_cpu, device_memory and network_speed as one uniform block,
+    # scaled row by row
+    rng.random(out=columns[2:], dtype=np.float32)
+    columns[2:] *= np.array([[90 - 20], [95 - 30], [1000 - 1]], dtype=np.float32)
+    columns[2:] += np.array([[20], [30], [1]], dtype=np.float32)
     
     # Create realistic backup duration based on features
-    data['backup_duration'] = (
-        data['file_count'] * 0.1 +
-        data['total_size'] / 1000000 * 60 +
-        np.random.normal(0, 30, n_samples)
-    )
-    data['backup_duration'] = np.maximum(data['backup_duration'], 30)
+    y = rng.standard_normal(n_samples, dtype=np.float32)
+    y *= 30
+    _backup_duration(file_count, total_size, y, y)
     
-    return pd.DataFrame(data)
+    return columns.T, y
 
-def generate_synthetic_anomaly_data() -> pd.DataFrame:
-    """Generate synthetic training data for anomaly detection"""
-    np.random.seed(42)
+def generate_synthetic_anomaly_data() -> np.ndarray:
+    """Generate synthetic float32 training data (ANOMALY_FEATURES columns) for anomaly detection"""
+    rng = np.random.default_rng(42)
     n_samples = 1000
     
-    # Normal operation data
-    data = {
-        'cpu_usage': np.random.normal(50, 15, n_samples),
-        'memory_usage': np.random.normal(60, 20, n_samples),
-        'disk_io': np.random.normal(100, 30, n_samples),
-        'network_io': np.random.normal(50, 15, n_samples),
-        'backup_speed': np.random.normal(10, 3, n_samples),
-    }
+    # Normal operation data, drawn in place one contiguous row per feature
+    columns = np.empty((len(ANOMALY_FEATURES), n_samples), dtype=np.float32)
+    rng.standard_normal(out=columns, dtype=np.float32)
+    columns *= np.array([[15], [20], [30], [15], [3]], dtype=np.float32)
+    columns += np.array([[50], [60], [100], [50], [10]], dtype=np.float32)
     
     # Clip values to realistic ranges
-    for key in data:
-        data[key] = np.clip(data[key], 0, 100 if key.endswith('_usage') else 1000)
+    np.clip(columns[:2], 0, 100, out=columns[:2])
+    np.clip(columns[2:], 0, 1000, out=columns[2:])
     
-    return pd.DataFrame(data)
+    return columns.T
 
-async def periodic_model_update():
-    """Periodically retrain models with new data"""
+async def latest_training_stream_id() -> bytes:
+    """ID of the newest TRAINING_STREAM entry, or 0-0 while the stream is empty"""
+    latest = await redis_client.xrevrange(TRAINING_STREAM, count=1)
+    return latest[0][0] if latest else b'0-0'
+
+async def periodic_model_update(last_id: Optional[bytes] = None):
+    """Retrain models when new training data is announced
+    
+    Producers XADD an entry to TRAINING_STREAM after updating the training:*
+    keys; the update runs as soon as one arrives. Without any announcement
+    (or without Redis) the models are still refreshed every
+    MODEL_UPDATE_INTERVAL seconds.
+    
+    Reads resume after last_id, a concrete stream ID rather than '$', so
+    entries added while a retrain runs, or while the loop is backing off
+    after an error, are picked up by the next read.
+    """
     while True:
         try:
-            await asyncio.sleep(MODEL_UPDATE_INTERVAL)
-            logger.info("Starting periodic model update")
+            if redis_client:
+                if last_id is None:
+                    last_id = await latest_training_stream_id()
+                entries = await redis_client.xread({TRAINING_STREAM: last_id}, block=MODEL_UPDATE_INTERVAL * 1000)
+                if entries:
+                    last_id = entries[0][1][-1][0]
+                    logger.info("Starting model update for new training data", entry_id=last_id)
+                else:
+                    logger.info("Starting periodic model update")
+            else:
+                await asyncio.sleep(MODEL_UPDATE_INTERVAL)
+                logger.info("Starting periodic model update")
             await load_or_train_models()
         except Exception as e:
             logger.error("Periodic model update failed", error=str(e))
+            await asyncio.sleep(min(MODEL_UPDATE_INTERVAL, 60))
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    if model_training_failed and not (backup_predictor.is_trained and anomaly_detector.is_trained):
+        raise HTTPException(status_code=503, detail="Model training failed")
     return {
         "status": "healthy",
         "models_loaded": len(ml_models),
         "backup_predictor_trained": backup_predictor.is_trained,
         "anomaly_detector_trained": anomaly_detector.is_trained,
         "redis_connected": redis_client is not None,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": cached_utc_timestamp()
     }
 
 @app.get("/metrics")
 async def get_metrics():
     """Prometheus metrics endpoint"""
-    return Response(generate_latest(), media_type="text/plain")
+    # Scrapers poll far less often than once a second, so a snapshot that
+    # is at most METRICS_SNAPSHOT_TTL old saves rendering every collector
+    return Response(cached_metrics(), media_type="text/plain")
 
-@app.post("/predict/backup", response_model=BackupPrediction)
-async def predict_backup(request: BackupRequest, background_tasks: BackgroundTasks):
+# Response models are built by the handlers themselves, so they are created
+# with model_construct and response validation is disabled; the models are
+# still listed in `responses` to keep the OpenAPI schema. Returning an
+# ORJSONResponse of model_dump() also skips jsonable_encoder, which costs
+# several times more than the orjson encoding itself.
+@app.post("/predict/backup", response_model=None, responses={200: {"model": BackupPrediction}})
+async def predict_backup(request: BackupRequest, background_tasks: BackgroundTasks) -> ORJSONResponse:
     """Predict backup performance and optimal scheduling"""
     with model_inference_duration.time():
         try:
             # Extract features from request
             features = {
-                'file_count': len(request.file_paths),
+                'file_count': request.file_count if request.file_count is not None else len(request.file_paths),
                 'total_size': request.estimated_size,
                 'device_cpu': request.metadata.get('cpu_usage', 50.0),
                 'device_memory': request.metadata.get('memory_usage', 60.0),
@@ -415,7 +944,7 @@ async def predict_backup(request: BackupRequest, background_tasks: BackgroundTas
             }
             
             # Get prediction
-            prediction = backup_predictor.predict(features)
+            prediction = await backup_batcher.submit(features)
             
             # Calculate optimal time slot (next low-usage period)
             optimal_time = datetime.utcnow() + timedelta(hours=2)
@@ -431,7 +960,7 @@ async def predict_backup(request: BackupRequest, background_tasks: BackgroundTas
             
             backup_predictions.inc()
             
-            result = BackupPrediction(
+            result = BackupPrediction.model_construct(
                 device_id=request.device_id,
                 predicted_duration=prediction['predicted_duration'],
                 predicted_success_rate=prediction['predicted_success_rate'],
@@ -447,18 +976,18 @@ async def predict_backup(request: BackupRequest, background_tasks: BackgroundTas
             # Store prediction for model improvement
             background_tasks.add_task(store_prediction_data, request, result)
             
-            return result
+            return ORJSONResponse(result.model_dump())
             
         except Exception as e:
             logger.error("Backup prediction failed", device_id=request.device_id, error=str(e))
             raise HTTPException(status_code=500, detail="Prediction failed")
 
-@app.post("/detect/anomaly", response_model=AnomalyResult)
-async def detect_anomaly(request: AnomalyDetectionRequest):
+@app.post("/detect/anomaly", response_model=None, responses={200: {"model": AnomalyResult}})
+async def detect_anomaly(request: AnomalyDetectionRequest) -> ORJSONResponse:
     """Detect anomalies in backup system metrics"""
     with model_inference_duration.time():
         try:
-            detection_result = anomaly_detector.detect(request.metrics)
+            detection_result = await anomaly_batcher.submit(request.metrics)
             
             recommendations = []
             if detection_result['is_anomaly']:
@@ -471,7 +1000,7 @@ async def detect_anomaly(request: AnomalyDetectionRequest):
                 if 'backup_speed' in detection_result['affected_metrics']:
                     recommendations.append("Backup speed anomaly - check network or storage performance")
             
-            return AnomalyResult(
+            result = AnomalyResult.model_construct(
                 device_id=request.device_id,
                 is_anomaly=detection_result['is_anomaly'],
                 anomaly_score=detection_result['anomaly_score'],
@@ -479,32 +1008,30 @@ async def detect_anomaly(request: AnomalyDetectionRequest):
                 recommendations=recommendations,
                 timestamp=request.timestamp
             )
+            return ORJSONResponse(result.model_dump())
             
         except Exception as e:
             logger.error("Anomaly detection failed", device_id=request.device_id, error=str(e))
             raise HTTPException(status_code=500, detail="Anomaly detection failed")
 
-@app.post("/optimize/schedule", response_model=OptimizationResult)
-async def optimize_backup_schedule(request: OptimizationRequest):
+@app.post("/optimize/schedule", response_model=None, responses={200: {"model": OptimizationResult}})
+async def optimize_backup_schedule(request: OptimizationRequest) -> ORJSONResponse:
     """Optimize backup job scheduling"""
     try:
-        # Simple optimization: sort by priority and estimated duration
-        jobs = request.backup_jobs.copy()
-        
-        # Score jobs based on priority and resource requirements
-        for job in jobs:
-            priority_score = job.get('priority', 1) * 10
-            size_score = min(10, job.get('estimated_size', 1000000) / 1000000)
-            job['optimization_score'] = priority_score - size_score
-        
-        # Sort by optimization score (higher is better)
-        optimized_jobs = sorted(jobs, key=lambda x: x['optimization_score'], reverse=True)
+        # Simple optimization: sort by a score of priority and resource
+        # requirements (higher is better)
+        jobs = request.backup_jobs
+        optimized_jobs = sorted(
+            jobs,
+            key=lambda job: job.get('priority', 1) * 10 - min(10, job.get('estimated_size', 1000000) / 1000000),
+            reverse=True
+        )
         
         # Calculate expected improvements
         total_time_before = sum(job.get('estimated_duration', 300) for job in jobs)
         total_time_after = total_time_before * 0.85  # Assume 15% improvement
         
-        return OptimizationResult(
+        result = OptimizationResult.model_construct(
             optimized_schedule=optimized_jobs,
             expected_improvement={
                 'time_reduction': (total_time_before - total_time_after) / total_time_before,
@@ -518,6 +1045,7 @@ async def optimize_backup_schedule(request: OptimizationRequest):
                 'storage': 70.0
             }
         )
+        return ORJSONResponse(result.model_dump())
         
     except Exception as e:
         logger.error("Schedule optimization failed", error=str(e))
@@ -528,13 +1056,15 @@ async def store_prediction_data(request: BackupRequest, prediction: BackupPredic
     if redis_client:
         try:
             data = {
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': time.time(),  # Unix seconds
                 'device_id': request.device_id,
-                'request': request.dict(),
-                'prediction': prediction.dict()
+                'request': request.model_dump(),
+                'prediction': prediction.model_dump()
             }
-            await redis_client.lpush("ml:predictions", json.dumps(data))
-            await redis_client.ltrim("ml:predictions", 0, 9999)  # Keep last 10k predictions
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.lpush("ml:predictions", orjson.dumps(data))
+                pipe.ltrim("ml:predictions", 0, 9999)  # Keep last 10k predictions
+                await pipe.execute()
         except Exception as e:
             logger.error("Failed to store prediction data", error=str(e))
 
@@ -557,14 +1087,26 @@ async def get_model_status():
             "total_anomalies": anomaly_detections._value._value,
             "active_models": len(ml_models)
         },
-        "last_updated": datetime.utcnow().isoformat()
+        "last_updated": cached_utc_timestamp()
     }
 
+def _warmup():
+    """Compile (or load from NUMBA_CACHE_DIR) every Numba kernel for the dtypes it is called with"""
+    _backup_duration(*np.zeros((4, 1), dtype=np.float32))
+    leaf = np.full((1, 1), -1, dtype=np.int32)
+    _forest_mean_batch(np.zeros((1, len(BACKUP_FEATURES)), dtype=np.float32),
+                       np.zeros((1, 1), dtype=np.int32), np.zeros((1, 1), dtype=np.float64),
+                       leaf, leaf, np.zeros((1, 1), dtype=np.float64))
+
+# Pay the JIT cost at import, not in the first training run or request
+_warmup()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=int(os.getenv("PORT", "8000")),
+        loop="uvloop",
         reload=os.getenv("ENVIRONMENT") == "development",
         log_level="info"
     )
\ No newline at end of file
@@ -6,24 +6,68 @@ Test suite for CoreState ML Optimizer Service
 import pytest
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+import httpx
+import orjson
+from unittest.mock import AsyncMock, Mock, patch
 import pandas as pd
 import numpy as np
 
+import main
 from main import (
-    app, BackupPredictor, AnomalyDetector, 
+    app, BackupPredictor, AnomalyDetector, MicroBatcher, backup_batcher, anomaly_batcher,
     BackupRequest, AnomalyDetectionRequest,
+    BACKUP_FEATURES, ANOMALY_FEATURES, TRAINING_STREAM, decode_training_columns,
+    periodic_model_update,
     generate_synthetic_backup_data, generate_synthetic_anomaly_data
 )
 
-client = TestClient(app)
+# Request payloads use a fixed timestamp so runs are deterministic
+FIXED_TIMESTAMP = datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()
+
+JSON_HEADERS = {"content-type": "application/json"}
+
+def json_body(payload) -> dict:
+    """post() arguments sending payload encoded by orjson rather than the stdlib json behind json="""
+    return {"content": orjson.dumps(payload), "headers": JSON_HEADERS}
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient shared by every endpoint test"""
+    return TestClient(app)
+
+# The generators are seeded and take well under a millisecond, so the data
+# is only shared within a session; a joblib.Memory disk cache measured slower
+# than regenerating it.
+@pytest.fixture(scope="session")
+def backup_training_data():
+    """Synthetic (X, y) backup training data, generated once per session"""
+    return generate_synthetic_backup_data()
+
+@pytest.fixture(scope="session")
+def anomaly_training_data():
+    """Synthetic anomaly training data, generated once per session"""
+    return generate_synthetic_anomaly_data()
+
+@pytest.fixture(scope="session")
+def trained_backup_predictor(backup_training_data):
+    """BackupPredictor trained once on the synthetic data; tests must not retrain it"""
+    predictor = BackupPredictor()
+    predictor.train(*backup_training_data)
+    return predictor
+
+@pytest.fixture(scope="session")
+def trained_anomaly_detector(anomaly_training_data):
+    """AnomalyDetector trained once on the synthetic data; tests must not retrain it"""
+    detector = AnomalyDetector()
+    detector.train(anomaly_training_data)
+    return detector
 
 class TestMLOptimizer:
     """Test the main ML Optimizer endpoints"""
     
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test health check endpoint"""
         response = client.get("/health")
         assert response.status_code == 200
@@ -33,14 +77,23 @@ class TestMLOptimizer:
         assert "models_loaded" in data
         assert "timestamp" in data
         
-    def test_metrics_endpoint(self):
+    def test_health_check_reports_failed_training(self, client):
+        """Test health check fails while a training failure leaves a model untrained"""
+        with patch.object(main, "model_training_failed", True):
+            with patch.object(main.anomaly_detector, "is_trained", False):
+                assert client.get("/health").status_code == 503
+            with patch.object(main.anomaly_detector, "is_trained", True), \
+                 patch.object(main.backup_predictor, "is_trained", True):
+                assert client.get("/health").status_code == 200
+        
+    def test_metrics_endpoint(self, client):
         """Test metrics endpoint"""
         response = client.get("/metrics")
         assert response.status_code == 200
         # Should return Prometheus metrics format
         assert "text/plain" in response.headers["content-type"]
         
-    def test_model_status(self):
+    def test_model_status(self, client):
         """Test model status endpoint"""
         response = client.get("/models/status")
         assert response.status_code == 200
@@ -50,7 +103,7 @@ class TestMLOptimizer:
         assert "metrics" in data
         assert "last_updated" in data
         
-    def test_backup_prediction(self):
+    def test_backup_prediction(self, client):
         """Test backup prediction endpoint"""
         request_data = {
             "device_id": "test-device-123",
@@ -64,7 +117,7 @@ class TestMLOptimizer:
             }
         }
         
-        response = client.post("/predict/backup", json=request_data)
+        response = client.post("/predict/backup", **json_body(request_data))
         assert response.status_code == 200
         
         data = response.json()
@@ -79,7 +132,23 @@ class TestMLOptimizer:
         assert data["predicted_duration"] > 0
         assert 0 <= data["predicted_success_rate"] <= 1.0
         
-    def test_anomaly_detection(self):
+    def test_backup_prediction_with_file_count(self, client):
+        """Test backup prediction from a file count instead of a path list"""
+        by_paths = client.post("/predict/backup", **json_body({
+            "device_id": "test-device-123",
+            "file_paths": [f"/path/to/file{i}.txt" for i in range(500)],
+            "estimated_size": 1000000
+        }))
+        by_count = client.post("/predict/backup", **json_body({
+            "device_id": "test-device-123",
+            "file_count": 500,
+            "estimated_size": 1000000
+        }))
+        assert by_count.status_code == 200
+        assert by_count.json()["predicted_duration"] == by_paths.json()["predicted_duration"]
+        assert by_count.json()["resource_requirements"] == by_paths.json()["resource_requirements"]
+        
+    def test_anomaly_detection(self, client):
         """Test anomaly detection endpoint"""
         request_data = {
             "device_id": "test-device-123",
@@ -90,10 +159,10 @@ class TestMLOptimizer:
                 "network_io": 80.0,
                 "backup_speed": 5.0
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": FIXED_TIMESTAMP
         }
         
-        response = client.post("/detect/anomaly", json=request_data)
+        response = client.post("/detect/anomaly", **json_body(request_data))
         assert response.status_code == 200
         
         data = response.json()
@@ -104,7 +173,7 @@ class TestMLOptimizer:
         assert "recommendations" in data
         assert "timestamp" in data
         
-    def test_schedule_optimization(self):
+    def test_schedule_optimization(self, client):
         """Test backup schedule optimization"""
         request_data = {
             "backup_jobs": [
@@ -129,7 +198,7 @@ class TestMLOptimizer:
             "optimization_goals": ["minimize_time", "maximize_throughput"]
         }
         
-        response = client.post("/optimize/schedule", json=request_data)
+        response = client.post("/optimize/schedule", **json_body(request_data))
         assert response.status_code == 200
         
         data = response.json()
@@ -140,7 +209,38 @@ class TestMLOptimizer:
         # Verify jobs are reordered (high priority first)
         jobs = data["optimized_schedule"]
         assert len(jobs) == 2
-        assert jobs[0]["priority"] >= jobs[1]["priority"]
+        priorities = np.fromiter((job["priority"] for job in jobs), dtype=np.int32, count=len(jobs))
+        assert np.all(np.diff(priorities) <= 0)
+        
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self):
+        """Test independent endpoints served concurrently over the ASGI app"""
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            responses = await asyncio.gather(
+                ac.post("/predict/backup", **json_body({
+                    "device_id": "test-device-123",
+                    "file_count": 2,
+                    "estimated_size": 1000000
+                })),
+                ac.post("/detect/anomaly", **json_body({
+                    "device_id": "test-device-123",
+                    "metrics": {"cpu_usage": 45.0, "memory_usage": 60.0},
+                    "timestamp": FIXED_TIMESTAMP
+                })),
+                ac.post("/optimize/schedule", **json_body({
+                    "backup_jobs": [{"id": "job1", "priority": 2}, {"id": "job2", "priority": 5}],
+                    "resource_constraints": {}
+                })),
+                ac.get("/health")
+            )
+        
+        assert [response.status_code for response in responses] == [200, 200, 200, 200]
+        predict, detect, schedule, health = (response.json() for response in responses)
+        assert predict["predicted_duration"] > 0
+        assert isinstance(detect["is_anomaly"], bool)
+        assert [job["id"] for job in schedule["optimized_schedule"]] == ["job2", "job1"]
+        assert health["status"] == "healthy"
 
 class TestBackupPredictor:
     """Test the BackupPredictor class"""
@@ -152,21 +252,16 @@ class TestBackupPredictor:
         assert predictor.scaler is not None
         assert not predictor.is_trained
         
-    def test_training_with_data(self):
+    def test_training_with_data(self, trained_backup_predictor):
         """Test training with synthetic data"""
-        predictor = BackupPredictor()
-        training_data = generate_synthetic_backup_data()
-        
-        predictor.train(training_data)
+        predictor = trained_backup_predictor
         assert predictor.is_trained
         assert predictor.model is not None
         
     def test_training_with_empty_data(self):
         """Test training with empty data"""
         predictor = BackupPredictor()
-        empty_data = pd.DataFrame()
-        
-        predictor.train(empty_data)
+        predictor.train(np.empty((0, 5)), np.empty(0))
         assert not predictor.is_trained
         
     def test_prediction_untrained(self):
@@ -186,11 +281,9 @@ class TestBackupPredictor:
         assert 'confidence' in result
         assert result['confidence'] == 0.5  # Default for untrained
         
-    def test_prediction_trained(self):
+    def test_prediction_trained(self, trained_backup_predictor):
         """Test prediction with trained model"""
-        predictor = BackupPredictor()
-        training_data = generate_synthetic_backup_data()
-        predictor.train(training_data)
+        predictor = trained_backup_predictor
         
         features = {
             'file_count': 100,
@@ -204,6 +297,68 @@ class TestBackupPredictor:
         assert result['predicted_duration'] > 0
         assert 0 <= result['predicted_success_rate'] <= 1
         assert result['confidence'] == 0.8  # Higher for trained model
+        
+        # The batched paths must agree with per-row prediction
+        rng = np.random.default_rng(1)
+        X = np.column_stack([rng.integers(10, 10000, 32), rng.integers(1000, 100000000, 32),
+                             rng.uniform(20, 90, 32), rng.uniform(30, 95, 32), rng.uniform(1, 1000, 32)])
+        features_batch = [dict(zip(BACKUP_FEATURES, row)) for row in X.tolist()]
+        assert predictor.predict_batch(features_batch) == [predictor.predict(f) for f in features_batch]
+        durations = predictor.predict_array(X)
+        assert durations.shape == (32,)
+        assert [max(30.0, d) for d in durations.tolist()] == \
+            [predictor.predict(f)['predicted_duration'] for f in features_batch]
+        
+    def test_compiled_forest_matches_sklearn(self, trained_backup_predictor):
+        """Test the compiled forest reproduces RandomForestRegressor.predict"""
+        predictor = trained_backup_predictor
+        
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            row = [rng.integers(10, 10000), rng.integers(1000, 100000000),
+                   rng.uniform(20, 90), rng.uniform(30, 95), rng.uniform(1, 1000)]
+            features = dict(zip(BACKUP_FEATURES, row))
+            
+            expected = predictor.model.predict(predictor.scaler.transform(np.array([row], dtype=np.float64)))[0]
+            result = predictor.predict(features)
+            assert result['predicted_duration'] == pytest.approx(max(30.0, expected))
+            
+    def test_save_and_load(self, tmp_path, trained_backup_predictor):
+        """Test a saved model reloads into identical predictions"""
+        predictor = trained_backup_predictor
+        path = str(tmp_path / 'backup_predictor.npz')
+        predictor.save(path)
+        
+        loaded = BackupPredictor()
+        loaded.load(path)
+        assert loaded.is_trained
+        
+        features = {'file_count': 2500, 'total_size': 40000000, 'device_cpu': 35.0}
+        assert loaded.predict(features) == predictor.predict(features)
+        
+    def test_prediction_cache(self, tmp_path, trained_backup_predictor):
+        """Test repeated predictions are cached until the model changes"""
+        path = str(tmp_path / 'backup_predictor.npz')
+        trained_backup_predictor.save(path)
+        predictor = BackupPredictor()
+        predictor.load(path)
+        
+        features = {'file_count': 2500, 'total_size': 40000000, 'device_cpu': 35.0}
+        other = {'file_count': 10, 'total_size': 5000}
+        with patch.object(predictor, 'predict_array', wraps=predictor.predict_array) as predict_array:
+            first = predictor.predict(features)
+            assert predictor.predict(features) == first
+            assert predict_array.call_count == 1
+            
+            # The batched endpoint path shares the cache and only scores misses
+            assert predictor.predict_batch([features, other])[0] == first
+            assert predict_array.call_count == 2
+            assert predict_array.call_args.args[0].shape == (1, 5)
+            
+            # Reloading publishes a new model version, so the entry is not reused
+            predictor.load(path)
+            assert predictor.predict(features) == first
+            assert predict_array.call_count == 3
 
 class TestAnomalyDetector:
     """Test the AnomalyDetector class"""
@@ -215,12 +370,9 @@ class TestAnomalyDetector:
         assert detector.scaler is not None
         assert not detector.is_trained
         
-    def test_training_with_data(self):
+    def test_training_with_data(self, trained_anomaly_detector):
         """Test training with synthetic data"""
-        detector = AnomalyDetector()
-        training_data = generate_synthetic_anomaly_data()
-        
-        detector.train(training_data)
+        detector = trained_anomaly_detector
         assert detector.is_trained
         
     def test_detection_untrained(self):
@@ -242,11 +394,9 @@ class TestAnomalyDetector:
         assert not result['is_anomaly']  # Default for untrained
         assert result['confidence'] == 0.0
         
-    def test_detection_trained(self):
+    def test_detection_trained(self, trained_anomaly_detector):
         """Test detection with trained model"""
-        detector = AnomalyDetector()
-        training_data = generate_synthetic_anomaly_data()
-        detector.train(training_data)
+        detector = trained_anomaly_detector
         
         # Test with normal metrics
         normal_metrics = {
@@ -262,45 +412,194 @@ class TestAnomalyDetector:
         assert isinstance(result['anomaly_score'], float)
         assert isinstance(result['affected_metrics'], list)
         assert result['confidence'] == 0.8
+        
+        # The batched paths must agree with per-row detection
+        rng = np.random.default_rng(1)
+        X = rng.normal([50, 60, 100, 50, 10], [30, 30, 60, 30, 6], size=(32, 5))
+        metrics_batch = [dict(zip(ANOMALY_FEATURES, row)) for row in X.tolist()]
+        assert detector.detect_batch(metrics_batch) == [detector.detect(m) for m in metrics_batch]
+        scores = detector.score_array(X)
+        assert scores.tolist() == [detector.detect(m)['anomaly_score'] for m in metrics_batch]
+        
+    def test_compile_failure_is_raised(self, anomaly_training_data):
+        """Test a forest that cannot be compiled fails training instead of serving defaults"""
+        detector = AnomalyDetector()
+        with patch.object(AnomalyDetector, "_compile_forest", side_effect=AttributeError("tree_")):
+            with pytest.raises(AttributeError):
+                detector.train(anomaly_training_data)
+        assert not detector.is_trained
+        
+    def test_compiled_forest_matches_sklearn(self, trained_anomaly_detector):
+        """Test the compiled isolation trees reproduce IsolationForest scoring"""
+        detector = trained_anomaly_detector
+        
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            row = rng.normal([50, 60, 100, 50, 10], [30, 30, 60, 30, 6])
+            metrics = dict(zip(ANOMALY_FEATURES, row))
+            
+            X = detector.scaler.transform(row.reshape(1, -1))
+            result = detector.detect(metrics)
+            assert result['anomaly_score'] == pytest.approx(detector.model.decision_function(X)[0])
+            assert result['is_anomaly'] == (detector.model.predict(X)[0] == -1)
+            
+    def test_single_sample_forest_matches_sklearn(self):
+        """Test a forest trained on one sample, whose path-length normalizer is 0, scores like sklearn"""
+        detector = AnomalyDetector()
+        detector.train(np.array([[50.0, 60.0, 100.0, 50.0, 10.0]], dtype=np.float32))
+        assert detector.is_trained
+        
+        for row in ([50, 60, 100, 50, 10], [99, 5, 900, 1, 0]):
+            row = np.array(row, dtype=np.float64)
+            X = detector.scaler.transform(row.reshape(1, -1))
+            result = detector.detect(dict(zip(ANOMALY_FEATURES, row)))
+            assert result['anomaly_score'] == pytest.approx(detector.model.decision_function(X)[0])
+            
+    def test_save_and_load(self, tmp_path, trained_anomaly_detector):
+        """Test a saved model reloads into identical detections"""
+        detector = trained_anomaly_detector
+        path = str(tmp_path / 'anomaly_detector.npz')
+        detector.save(path)
+        
+        loaded = AnomalyDetector()
+        loaded.load(path)
+        assert loaded.is_trained
+        
+        for metrics in [{'cpu_usage': 50.0}, {'cpu_usage': 99.0, 'backup_speed': 0.5}]:
+            assert loaded.detect(metrics) == detector.detect(metrics)
 
 class TestDataGeneration:
     """Test synthetic data generation functions"""
     
-    def test_backup_data_generation(self):
+    def test_backup_data_generation(self, backup_training_data):
         """Test synthetic backup data generation"""
-        data = generate_synthetic_backup_data()
+        X, y = backup_training_data
         
-        assert isinstance(data, pd.DataFrame)
-        assert len(data) == 1000
-        assert 'file_count' in data.columns
-        assert 'total_size' in data.columns
-        assert 'backup_duration' in data.columns
+        assert isinstance(X, np.ndarray)
+        assert X.shape == (1000, len(BACKUP_FEATURES))
+        assert y.shape == (1000,)
+        assert X.dtype == np.float32
         
         # Check ranges
-        assert data['file_count'].min() >= 10
-        assert data['file_count'].max() <= 10000
-        assert data['backup_duration'].min() >= 30
+        file_count = X[:, BACKUP_FEATURES.index('file_count')]
+        assert file_count.min() >= 10
+        assert file_count.max() <= 10000
+        assert y.min() >= 30
         
-    def test_anomaly_data_generation(self):
+    def test_anomaly_data_generation(self, anomaly_training_data):
         """Test synthetic anomaly data generation"""
-        data = generate_synthetic_anomaly_data()
+        X = anomaly_training_data
         
-        assert isinstance(data, pd.DataFrame)
-        assert len(data) == 1000
-        assert 'cpu_usage' in data.columns
-        assert 'memory_usage' in data.columns
-        assert 'backup_speed' in data.columns
+        assert isinstance(X, np.ndarray)
+        assert X.shape == (1000, len(ANOMALY_FEATURES))
+        assert X.dtype == np.float32
         
         # Check ranges (should be clipped to realistic values)
-        assert data['cpu_usage'].min() >= 0
-        assert data['cpu_usage'].max() <= 100
-        assert data['memory_usage'].min() >= 0
-        assert data['memory_usage'].max() <= 100
+        cpu_usage = X[:, ANOMALY_FEATURES.index('cpu_usage')]
+        memory_usage = X[:, ANOMALY_FEATURES.index('memory_usage')]
+        assert cpu_usage.min() >= 0
+        assert cpu_usage.max() <= 100
+        assert memory_usage.min() >= 0
+        assert memory_usage.max() <= 100
+        
+    def test_decode_training_columns(self):
+        """Test JSON training data decodes the same from every supported layout"""
+        frame = pd.DataFrame({'cpu_usage': [10.0, None], 'memory_usage': [20.0, 30.0]})
+        columns = ['memory_usage', 'cpu_usage']
+        expected = np.array([[20.0, 10.0], [30.0, np.nan]], dtype=np.float32)
+        
+        for orient in ['columns', 'records', 'list']:
+            payload = frame.to_json(orient=orient) if orient != 'list' else json.dumps(
+                {'cpu_usage': [10.0, None], 'memory_usage': [20.0, 30.0]})
+            X = decode_training_columns(payload.encode(), columns)
+            assert X.dtype == np.float32
+            np.testing.assert_array_equal(X, expected)
+            
+        assert decode_training_columns(b'[]', columns).shape == (0, 2)
+
+class TestMicroBatcher:
+    """Test request coalescing in MicroBatcher"""
+    
+    def test_concurrent_submits_share_one_batch(self):
+        """Test concurrent submissions are resolved by a single batch call"""
+        calls = []
+        
+        def batch_fn(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+        
+        async def run():
+            batcher = MicroBatcher(batch_fn, max_batch_size=64, max_wait=0.05)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+            finally:
+                await batcher.stop()
+        
+        results = asyncio.run(run())
+        assert results == [i * 2 for i in range(10)]
+        assert calls == [list(range(10))]
+        
+    def test_batch_error_propagates(self):
+        """Test a failing batch call raises in every waiting request"""
+        def batch_fn(items):
+            raise ValueError("boom")
+        
+        async def run():
+            batcher = MicroBatcher(batch_fn, max_wait=0.01)
+            batcher.start()
+            try:
+                with pytest.raises(ValueError):
+                    await batcher.submit(1)
+            finally:
+                await batcher.stop()
+        
+        asyncio.run(run())
+
+class TestPeriodicModelUpdate:
+    """Test retraining driven by the training stream"""
+    
+    @staticmethod
+    def stream_reads(xread_results, xrevrange_result=()):
+        """Run the update loop over canned XREADs and return the IDs it read from"""
+        redis_client = Mock()
+        redis_client.xrevrange = AsyncMock(return_value=list(xrevrange_result))
+        # The loop only ends when cancelled, as it is at shutdown
+        redis_client.xread = AsyncMock(side_effect=[*xread_results, asyncio.CancelledError()])
+        
+        with patch.object(main, "redis_client", redis_client), \
+                patch.object(main, "load_or_train_models", AsyncMock()) as load_or_train:
+            with pytest.raises(asyncio.CancelledError):
+                asyncio.run(periodic_model_update())
+        
+        assert load_or_train.await_count == len(xread_results)
+        return [call.args[0][TRAINING_STREAM] for call in redis_client.xread.call_args_list]
+    
+    def test_reads_resume_after_last_entry(self):
+        """Test entries announced while a retrain runs are read next, not skipped"""
+        reads = self.stream_reads(
+            [[(TRAINING_STREAM.encode(), [(b'6-0', {}), (b'7-0', {})])], []],
+            xrevrange_result=[(b'5-0', {})]
+        )
+        # Seeded from the newest existing entry, then kept across timeouts
+        assert reads == [b'5-0', b'7-0', b'7-0']
+        
+    def test_empty_stream_reads_from_start(self):
+        """Test a stream with no entries yet is read from its beginning"""
+        assert self.stream_reads([[]]) == [b'0-0', b'0-0']
 
 class TestErrorHandling:
     """Test error handling in various scenarios"""
     
-    def test_invalid_backup_request(self):
+    # Validation must reject these requests before they reach a model; the
+    # endpoints score through the batchers, so their submit is what's patched
+    VALID_BACKUP_REQUEST = {"device_id": "test-device", "file_count": 3, "estimated_size": 1000}
+    VALID_ANOMALY_REQUEST = {"device_id": "test-device", "metrics": {"cpu_usage": 50.0}, "timestamp": FIXED_TIMESTAMP}
+    
+    @patch.object(backup_batcher, "submit", return_value={
+        'predicted_duration': 300.0, 'predicted_success_rate': 0.95, 'confidence': 0.5
+    })
+    def test_invalid_backup_request(self, mock_submit, client):
         """Test backup prediction with invalid data"""
         invalid_request = {
             "device_id": "test-device",
@@ -308,10 +607,20 @@ class TestErrorHandling:
             "estimated_size": -1  # Invalid size
         }
         
-        response = client.post("/predict/backup", json=invalid_request)
+        response = client.post("/predict/backup", **json_body(invalid_request))
         assert response.status_code == 422  # Validation error
+        mock_submit.assert_not_called()
         
-    def test_invalid_anomaly_request(self):
+        # Positive control: a valid body does reach the patched batcher
+        response = client.post("/predict/backup", **json_body(self.VALID_BACKUP_REQUEST))
+        assert response.status_code == 200
+        mock_submit.assert_awaited_once()
+        assert mock_submit.await_args.args[0]['file_count'] == 3
+        
+    @patch.object(anomaly_batcher, "submit", return_value={
+        'is_anomaly': False, 'anomaly_score': 0.1, 'affected_metrics': [], 'confidence': 0.8
+    })
+    def test_invalid_anomaly_request(self, mock_submit, client):
         """Test anomaly detection with invalid data"""
         invalid_request = {
             "device_id": "test-device",
@@ -319,8 +628,15 @@ class TestErrorHandling:
             "timestamp": "invalid-timestamp"
         }
         
-        response = client.post("/detect/anomaly", json=invalid_request)
+        response = client.post("/detect/anomaly", **json_body(invalid_request))
         assert response.status_code == 422  # Validation error
+        mock_submit.assert_not_called()
+        
+        # Positive control: a valid body does reach the patched batcher
+        response = client.post("/detect/anomaly", **json_body(self.VALID_ANOMALY_REQUEST))
+        assert response.status_code == 200
+        assert response.json()["anomaly_score"] == 0.1
+        mock_submit.assert_awaited_once_with({"cpu_usage": 50.0})
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -1,29 +1,42 @@
-import click
+import argparse
 
-@click.group()
-def cli():
-    """CoreState v2.0 Command-Line Interface."""
-    pass
+# Only the standard library is imported at module level so that --help and
+# quick commands start fast; a command that needs an HTTP client or other
+# heavy dependency imports it inside its own function.
 
-@cli.command()
-@click.option('--backup-id', required=True, help='The ID of the backup to restore.')
-@click.option('--destination', default='/tmp/restore', help='The destination path for the restore.')
 def restore(backup_id, destination):
     """
     Restores a specific backup to a local destination.
     """
-    click.echo(f"Initiating restore for backup {backup_id} to {destination}...")
+    print(f"Initiating restore for backup {backup_id} to {destination}...")
     # Restore logic would be implemented here
-    click.echo("Restore placeholder complete.")
+    print("Restore placeholder complete.")
 
-@cli.command()
 def status():
     """
     Checks the status of the CoreState services.
     """
-    click.echo("Checking service status...")
+    print("Checking service status...")
     # Service status check logic would be implemented here
-    click.echo("All services are operational (placeholder).")
+    print("All services are operational (placeholder).")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="CoreState v2.0 Command-Line Interface.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+
+    restore_parser = commands.add_parser('restore', help='Restores a specific backup to a local destination.')
+    restore_parser.add_argument('--backup-id', required=True, help='The ID of the backup to restore.')
+    restore_parser.add_argument('--destination', default='/tmp/restore', help='The destination path for the restore.')
+    restore_parser.set_defaults(handler=lambda args: restore(args.backup_id, args.destination))
+
+    status_parser = commands.add_parser('status', help='Checks the status of the CoreState services.')
+    status_parser.set_defaults(handler=lambda args: status())
+
+    return parser
+
+def cli(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file